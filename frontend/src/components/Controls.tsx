@@ -1,7 +1,10 @@
 // frontend/src/components/Controls.tsx
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import * as api from "../services/api";
-import type { LatLng } from "../types";
+import type { LatLng, OptimizeResponse } from "../types";
+
+// 自動再最適化: 最後の編集からこの時間が経過したら実行する
+const AUTO_OPTIMIZE_DELAY_MS = 800;
 
 type Props = {
 	depot: LatLng | null;
@@ -27,6 +30,39 @@ export default function Controls({
 	onOptimized,
 }: Props) {
 	const [busy, setBusy] = useState(false);
+	const [autoEnabled, setAutoEnabled] = useState(false);
+
+	// 自動再最適化のコールバックから常に最新の props を参照する
+	const handlers = useRef({ onOptimized, onError });
+	handlers.current = { onOptimized, onError };
+
+	const applyResult = (res: OptimizeResponse) => {
+		const km = Math.round((res.total_distance / 1000) * 10) / 10; // 小数1桁
+		handlers.current.onOptimized({
+			order: res.route,
+			polylines: res.route_geometries,
+			km,
+		});
+	};
+
+	const [auto] = useState(() =>
+		api.createAutoOptimizer(
+			(res) => applyResult(res),
+			(e: any) =>
+				handlers.current.onError(e?.message ?? "最適化に失敗しました。"),
+			AUTO_OPTIMIZE_DELAY_MS,
+		),
+	);
+
+	useEffect(() => {
+		if (!autoEnabled || !depot || locations.length < 1) {
+			auto.cancel();
+			return;
+		}
+		auto.schedule({ depot, locations });
+	}, [auto, autoEnabled, depot, locations]);
+
+	useEffect(() => () => auto.cancel(), [auto]);
 
 	const optimize = async () => {
 		onError(null);
@@ -34,13 +70,15 @@ export default function Controls({
 			onError("出発地点と訪問地点を設定してください。");
 			return;
 		}
+		auto.cancel();
 		setBusy(true);
 		try {
-			const res = await api.optimize({ depot, locations });
-			const km = Math.round((res.total_distance / 1000) * 10) / 10; // 小数1桁
-			onOptimized({ order: res.route, polylines: res.route_geometries, km });
+			applyResult(await api.optimize({ depot, locations }));
 		} catch (e: any) {
-			onError(e?.message ?? "最適化に失敗しました。");
+			// 新しいリクエストに置き換えられた場合はエラー表示しない
+			if (!api.isAbortError(e)) {
+				onError(e?.message ?? "最適化に失敗しました。");
+			}
 		} finally {
 			setBusy(false);
 		}
@@ -107,6 +145,24 @@ export default function Controls({
 				{busy ? "🔄 計算中…" : "🚀 最適化を実行"}
 			</button>
 
+			<label
+				style={{
+					display: "flex",
+					alignItems: "center",
+					gap: "8px",
+					fontSize: "13px",
+					color: "#374151",
+					cursor: "pointer",
+				}}
+			>
+				<input
+					type="checkbox"
+					checked={autoEnabled}
+					onChange={(e) => setAutoEnabled(e.currentTarget.checked)}
+				/>
+				地点を編集したら自動で再最適化
+			</label>
+
 			<button
 				type="button"
 				onClick={onReset}
@@ -1,8 +1,8 @@
 // frontend/src/components/MapView.tsx
 
-import polyline from "@mapbox/polyline";
 import L from "leaflet";
 import { useEffect, useRef } from "react";
+import { decodePolylines, legLatLngs } from "../services/polylineDecoder";
 import type { LatLng } from "../types";
 
 type Props = {
@@ -15,6 +15,10 @@ type Props = {
 
 const TOKYO_TOWER: LatLng = { lat: 35.6586, lng: 139.7454 };
 
+// ルートの間引き度合い（画面上のピクセル単位）。Leaflet がズームごとに
+// Douglas-Peucker で簡略化するため、ズームアウト時ほど点数が減る。
+const ROUTE_SMOOTH_FACTOR = 1.5;
+
 export default function MapView({
 	depot,
 	locations,
@@ -25,6 +29,7 @@ export default function MapView({
 	const mapRef = useRef<any>(null);
 	const markersRef = useRef<any>(null);
 	const routeRef = useRef<any>(null);
+	const rendererRef = useRef<any>(null);
 	const containerRef = useRef<HTMLDivElement | null>(null);
 
 	// 初期化 + クリックハンドラ（onMapClick の最新を常に使う）
@@ -42,6 +47,8 @@ export default function MapView({
 			mapRef.current = m;
 			markersRef.current = L.layerGroup().addTo(m);
 			routeRef.current = L.layerGroup().addTo(m);
+			// レグ数が多くても DOM 要素が増えないよう canvas に描画する
+			rendererRef.current = L.canvas({ padding: 0.5 });
 		}
 
 		if (!mapRef.current) return;
@@ -87,28 +94,37 @@ export default function MapView({
 		}
 	}, [depot, locations, order]);
 
-	// ルート描画（polyline6 -> LatLngs）
+	// ルート描画（polyline6 を Worker でデコード -> canvas 上の 1 レイヤー）
 	useEffect(() => {
 		if (!mapRef.current || !routeRef.current) return;
 		const layer = routeRef.current;
-		layer.clearLayers();
-		polylines.forEach((pl) => {
-			if (!pl) return;
-			try {
-				const latlngs = (polyline.decode(pl, 6) as [number, number][]).map(
-					([lat, lng]: [number, number]) => [lat, lng],
-				) as [number, number][];
-				if (latlngs.length > 0) {
-					L.polyline(latlngs, {
-						color: "#1976d2",
-						weight: 4,
-						opacity: 0.8,
-					}).addTo(layer);
-				}
-			} catch (_e) {
-				// silently skip invalid polyline
+		let cancelled = false;
+		if (polylines.length === 0) {
+			layer.clearLayers();
+			return;
+		}
+		decodePolylines(polylines, 6).then((res) => {
+			// デコード中に新しいルートが来た場合は古い結果を捨てる
+			if (cancelled) return;
+			const legs: [number, number][][] = [];
+			for (let i = 0; i < res.offsets.length - 1; i++) {
+				if (res.offsets[i + 1] > res.offsets[i]) legs.push(legLatLngs(res, i));
 			}
+			layer.clearLayers();
+			if (legs.length === 0) return;
+			// 全レグを 1 つのマルチポリラインにまとめて描画コストを抑える
+			L.polyline(legs, {
+				color: "#1976d2",
+				weight: 4,
+				opacity: 0.8,
+				renderer: rendererRef.current,
+				smoothFactor: ROUTE_SMOOTH_FACTOR,
+				interactive: false,
+			}).addTo(layer);
 		});
+		return () => {
+			cancelled = true;
+		};
 	}, [polylines]);
 
 	return <div ref={containerRef} style={{ width: "100%", height: "100%" }} />;
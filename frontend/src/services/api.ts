@@ -3,19 +3,81 @@ import type { OptimizeRequest, OptimizeResponse } from "../types";
 
 const BASE = import.meta.env.VITE_API_BASE_URL ?? "";
 
+// 直近の最適化結果を保持する件数
+const CACHE_SIZE = 32;
+
 export async function health(): Promise<{ status: string }> {
 	const r = await fetch(`${BASE}/api/health`);
 	if (!r.ok) throw new Error(`health failed: ${r.status}`);
 	return r.json();
 }
 
-export async function optimize(
+// 座標はサーバー側と同じく小数 6 桁で丸め、フィールド順を固定してキーにする
+function canonicalKey(payload: OptimizeRequest): string {
+	const pt = (p: { lat: number; lng: number }) =>
+		`${p.lat.toFixed(6)},${p.lng.toFixed(6)}`;
+	return [
+		pt(payload.depot),
+		payload.locations.map(pt).join(";"),
+		payload.priority ?? "interactive",
+		payload.max_latency_ms ?? "",
+	].join("|");
+}
+
+// Map の挿入順を利用した LRU キャッシュ
+const cache = new Map<string, OptimizeResponse>();
+
+function cacheGet(key: string): OptimizeResponse | undefined {
+	const hit = cache.get(key);
+	if (hit) {
+		cache.delete(key);
+		cache.set(key, hit);
+	}
+	return hit;
+}
+
+function cachePut(key: string, value: OptimizeResponse) {
+	cache.delete(key);
+	cache.set(key, value);
+	while (cache.size > CACHE_SIZE) {
+		cache.delete(cache.keys().next().value as string);
+	}
+}
+
+export function clearOptimizeCache() {
+	cache.clear();
+}
+
+type InFlight = {
+	key: string;
+	promise: Promise<OptimizeResponse>;
+	controller: AbortController;
+	waiters: number;
+};
+
+// 同一リクエストの実行中 fetch（合流用）と、最後に開始したリクエスト
+const inFlight = new Map<string, InFlight>();
+let latestKey: string | null = null;
+
+export function isAbortError(e: unknown): boolean {
+	return e instanceof DOMException && e.name === "AbortError";
+}
+
+// 中断と同時に合流対象から外し、同じ内容の次の呼び出しが新しい fetch を始めるようにする
+function abortEntry(entry: InFlight) {
+	if (inFlight.get(entry.key) === entry) inFlight.delete(entry.key);
+	entry.controller.abort();
+}
+
+async function postOptimize(
 	payload: OptimizeRequest,
+	signal: AbortSignal,
 ): Promise<OptimizeResponse> {
 	const r = await fetch(`${BASE}/api/optimize`, {
 		method: "POST",
 		headers: { "Content-Type": "application/json" },
 		body: JSON.stringify(payload),
+		signal,
 	});
 	const data = await r.json();
 	if (!r.ok) {
@@ -24,3 +86,127 @@ export async function optimize(
 	}
 	return data as OptimizeResponse;
 }
+
+function start(key: string, payload: OptimizeRequest): InFlight {
+	const controller = new AbortController();
+	const entry: InFlight = {
+		key,
+		controller,
+		waiters: 0,
+		promise: postOptimize(payload, controller.signal)
+			.then((res) => {
+				cachePut(key, res);
+				return res;
+			})
+			.finally(() => {
+				if (inFlight.get(key) === entry) inFlight.delete(key);
+			}),
+	};
+	// 呼び出し側が全員離脱した場合の未処理 reject を防ぐ
+	entry.promise.catch(() => {});
+	inFlight.set(key, entry);
+	return entry;
+}
+
+// 呼び出し側ごとの signal で待機だけを中断する。待機者がいなくなれば fetch も中断する
+function wait(
+	entry: InFlight,
+	signal?: AbortSignal,
+): Promise<OptimizeResponse> {
+	entry.waiters++;
+	return new Promise<OptimizeResponse>((resolve, reject) => {
+		let left = false;
+		const leave = () => {
+			if (left) return;
+			left = true;
+			entry.waiters--;
+			signal?.removeEventListener("abort", onAbort);
+		};
+		const onAbort = () => {
+			leave();
+			if (entry.waiters === 0) abortEntry(entry);
+			reject(new DOMException("Aborted", "AbortError"));
+		};
+		if (signal?.aborted) return onAbort();
+		signal?.addEventListener("abort", onAbort, { once: true });
+		entry.promise.then(
+			(res) => {
+				leave();
+				resolve(res);
+			},
+			(e) => {
+				leave();
+				reject(e);
+			},
+		);
+	});
+}
+
+/**
+ * 最適化を実行する。
+ * - 同じ内容の結果がキャッシュにあれば通信せずに返す。
+ * - 同じ内容のリクエストが実行中なら、その結果を共有する。
+ * - 内容の異なる新しいリクエストが来ると、古いリクエストは中断され
+ *   AbortError で reject される（`isAbortError` で判定できる）。
+ */
+export function optimize(
+	payload: OptimizeRequest,
+	options: { signal?: AbortSignal } = {},
+): Promise<OptimizeResponse> {
+	const key = canonicalKey(payload);
+	// 後から来た別内容のリクエストが、実行中の古いリクエストを置き換える
+	if (latestKey !== null && latestKey !== key) {
+		const superseded = inFlight.get(latestKey);
+		if (superseded) abortEntry(superseded);
+	}
+	latestKey = key;
+
+	const hit = cacheGet(key);
+	if (hit) return Promise.resolve(hit);
+
+	const running = inFlight.get(key);
+	const entry =
+		running && !running.controller.signal.aborted
+			? running
+			: start(key, payload);
+	return wait(entry, options.signal);
+}
+
+/**
+ * 地点編集後の自動再最適化用。最後の `schedule` から `delayMs` 経過後に
+ * 1 回だけ最適化し、その間の呼び出しはまとめて破棄する。
+ */
+export function createAutoOptimizer(
+	onResult: (res: OptimizeResponse) => void,
+	onError: (e: unknown) => void,
+	delayMs = 800,
+) {
+	let timer: ReturnType<typeof setTimeout> | null = null;
+	let controller: AbortController | null = null;
+
+	const cancel = () => {
+		if (timer) clearTimeout(timer);
+		timer = null;
+		controller?.abort();
+		controller = null;
+	};
+
+	const schedule = (payload: OptimizeRequest) => {
+		cancel();
+		timer = setTimeout(() => {
+			timer = null;
+			const c = new AbortController();
+			controller = c;
+			optimize(payload, { signal: c.signal })
+				.then(onResult)
+				.catch((e) => {
+					if (!isAbortError(e)) onError(e);
+				})
+				.finally(() => {
+					if (controller === c) controller = null;
+				});
+		}, delayMs);
+	};
+
+	return { schedule, cancel };
+}
@@ -0,0 +1,93 @@
+// frontend/src/services/polylineDecoder.ts
+import polyline from "@mapbox/polyline";
+
+export type DecodeRequest = {
+	id: number;
+	polylines: string[];
+	precision: number;
+};
+
+// coords: 全レグの [lat, lng, ...]、offsets[i]..offsets[i+1]: i 番目のレグの点
+export type DecodeResponse = {
+	id: number;
+	coords: Float64Array;
+	offsets: Uint32Array;
+};
+
+type Pending = {
+	req: DecodeRequest;
+	resolve: (r: DecodeResponse) => void;
+};
+
+let worker: Worker | null = null;
+let workerFailed = false;
+let nextId = 0;
+const pending = new Map<number, Pending>();
+
+function getWorker(): Worker | null {
+	if (worker || workerFailed || typeof Worker === "undefined") return worker;
+	worker = new Worker(
+		new URL("../workers/polyline.worker.ts", import.meta.url),
+		{ type: "module" },
+	);
+	worker.onmessage = (e: MessageEvent<DecodeResponse>) => {
+		const p = pending.get(e.data.id);
+		pending.delete(e.data.id);
+		p?.resolve(e.data);
+	};
+	worker.onerror = () => {
+		// Worker が起動できない場合は以降メインスレッドでデコードする
+		workerFailed = true;
+		worker?.terminate();
+		worker = null;
+		for (const { req, resolve } of pending.values()) {
+			resolve(decodeInline(req.polylines, req.precision));
+		}
+		pending.clear();
+	};
+	return worker;
+}
+
+// Worker が使えない環境向けのフォールバック（メインスレッドでデコード）
+function decodeInline(polylines: string[], precision: number): DecodeResponse {
+	const legs = polylines.map((pl) => {
+		try {
+			return pl ? (polyline.decode(pl, precision) as [number, number][]) : [];
+		} catch (_e) {
+			return [];
+		}
+	});
+	const offsets = new Uint32Array(legs.length + 1);
+	legs.forEach((leg, i) => {
+		offsets[i + 1] = offsets[i] + leg.length;
+	});
+	const coords = new Float64Array(legs.flat(2));
+	return { id: -1, coords, offsets };
+}
+
+/** polyline 群を Web Worker でデコードし、連結済みの型付き配列で返す。 */
+export function decodePolylines(
+	polylines: string[],
+	precision = 6,
+): Promise<DecodeResponse> {
+	const w = getWorker();
+	if (!w) return Promise.resolve(decodeInline(polylines, precision));
+	const id = nextId++;
+	const req: DecodeRequest = { id, polylines, precision };
+	return new Promise((resolve) => {
+		pending.set(id, { req, resolve });
+		w.postMessage(req);
+	});
+}
+
+/** i 番目のレグを Leaflet に渡せる [lat, lng][] に変換する。 */
+export function legLatLngs(
+	res: DecodeResponse,
+	i: number,
+): [number, number][] {
+	const out: [number, number][] = [];
+	for (let k = res.offsets[i] * 2; k < res.offsets[i + 1] * 2; k += 2) {
+		out.push([res.coords[k], res.coords[k + 1]]);
+	}
+	return out;
+}
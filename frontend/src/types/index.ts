@@ -4,6 +4,8 @@ export type LatLng = { lat: number; lng: number };
 export type OptimizeRequest = {
 	depot: LatLng;
 	locations: LatLng[];
+	max_latency_ms?: number; // 許容できる応答時間（ミリ秒）。省略時はサーバー既定値
+	priority?: "interactive" | "batch"; // 混雑時の処理優先度（既定: interactive）
 };
 
 export type OptimizeResponse = {
@@ -0,0 +1,38 @@
+// frontend/src/workers/polyline.worker.ts
+// polyline6 のデコードをメインスレッド外で行う Web Worker
+import polyline from "@mapbox/polyline";
+import type {
+	DecodeRequest,
+	DecodeResponse,
+} from "../services/polylineDecoder";
+
+self.onmessage = (e: MessageEvent<DecodeRequest>) => {
+	const { id, polylines, precision } = e.data;
+	const legs: [number, number][][] = polylines.map((pl) => {
+		if (!pl) return [];
+		try {
+			return polyline.decode(pl, precision) as [number, number][];
+		} catch (_e) {
+			// 不正な polyline は空のレグとして扱う
+			return [];
+		}
+	});
+
+	// 全レグを 1 本の [lat, lng, lat, lng, ...] 配列に詰め、offsets で区切る
+	const offsets = new Uint32Array(legs.length + 1);
+	for (let i = 0; i < legs.length; i++) {
+		offsets[i + 1] = offsets[i] + legs[i].length;
+	}
+	const coords = new Float64Array(offsets[legs.length] * 2);
+	legs.forEach((leg, i) => {
+		let k = offsets[i] * 2;
+		for (const [lat, lng] of leg) {
+			coords[k++] = lat;
+			coords[k++] = lng;
+		}
+	});
+
+	const res: DecodeResponse = { id, coords, offsets };
+	// バッファはコピーせずに所有権ごと渡す
+	self.postMessage(res, { transfer: [coords.buffer, offsets.buffer] });
+};
@@ -1,17 +1,46 @@
+import cProfile
+import dataclasses
+import json
+import logging
+import math
 import os
-from flask import Flask, jsonify, request
+import time
+from typing import List, Optional, Tuple
+
+# Startup timings in /api/health/ready are measured from here
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, abort, jsonify, request, send_file
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+from .budget import TimeBudgetPolicy
 from .config import Config
-from .schemas import OptimizeRequest
+from .insertion import cheapest_insertions, tour_costs
+from .matrix import DistanceMatrix
+from .schemas import (
+    PACKED_COORDS_MIMETYPE,
+    parse_optimize_options,
+    validate_evaluate_payload,
+    validate_insertion_payload,
+    validate_optimize_payload,
+    validate_packed_coords,
+)
+from .osrm_backends import OsrmBackends
 from .osrm_client import (
     get_distance_matrix,
     get_route_geometries,
     OsrmError,
 )
-from .solver import solve_tsp_distance_matrix
+from .profiling import ProfileStore, default_profile_dir, request_fingerprint
+from .scheduler import Overloaded, SolveScheduler
+from .snapshot import SnapshotStore
+from .spatial import expand_route, merge_colocated
+from .warmup import SolverWarmup
+
+# server.solver (OR-Tools) is deliberately not imported here: it dominates
+# cold start, so it is loaded by the warmup thread or on first use.
 
 
 app = Flask(__name__)
@@ -19,29 +48,151 @@ origins_env = os.getenv("CORS_ALLOWED_ORIGINS", "*")
 origins = [o.strip() for o in origins_env.split(",")] if origins_env else "*"
 CORS(app, resources={r"/api/*": {"origins": origins}})
 limiter = Limiter(get_remote_address, app=app, default_limits=[Config.RATE_LIMIT_RULE])
+osrm = OsrmBackends(
+    Config.OSRM_BASE_URLS,
+    hedge_percentile=Config.OSRM_HEDGE_PERCENTILE,
+    hedge_initial_ms=Config.OSRM_HEDGE_INITIAL_MS,
+    failure_threshold=Config.OSRM_FAILURE_THRESHOLD,
+    cooldown_s=Config.OSRM_COOLDOWN_S,
+    max_workers=Config.OSRM_MAX_WORKERS,
+)
+snapshots = (
+    SnapshotStore(Config.SNAPSHOT_DIR, reload_interval_s=Config.SNAPSHOT_RELOAD_S)
+    if Config.SNAPSHOT_DIR
+    else None
+)
+scheduler = SolveScheduler(
+    max_concurrent=Config.SOLVER_MAX_CONCURRENT,
+    max_queue=Config.SOLVER_MAX_QUEUE,
+    max_wait_s=Config.SOLVER_MAX_QUEUE_WAIT_S,
+)
+profiles = ProfileStore(
+    Config.PROFILE_DIR or default_profile_dir(),
+    token=Config.PROFILE_TOKEN,
+    sample_rate=Config.PROFILE_SAMPLE_RATE,
+    keep=Config.PROFILE_KEEP,
+)
+budget = TimeBudgetPolicy(
+    max_ms=Config.SOLVER_TIME_LIMIT_MS,
+    min_ms=Config.SOLVER_MIN_TIME_MS,
+    slo_ms=Config.LATENCY_SLO_MS,
+)
+warmup = SolverWarmup(origin=_IMPORT_STARTED)
+if Config.SOLVER_WARMUP:
+    warmup.start()
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional fast path
+    orjson = None
+
+
+def overloaded_response(e: Overloaded) -> Response:
+    resp = jsonify(
+        error="OVERLOADED",
+        message="サーバーが混雑しています。しばらく待ってから再試行してください。",
+    )
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(math.ceil(e.retry_after_s))
+    return resp
+
+
+def json_response(body: dict, status: int = 200) -> Response:
+    """Serialise a response body with orjson when available, else stdlib json."""
+    if orjson is not None:
+        data = orjson.dumps(body, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        data = json.dumps(body, separators=(",", ":"))
+    return Response(data, status=status, mimetype="application/json")
 
 
 @app.get("/api/health")
+@app.get("/api/health/live")
+@limiter.exempt
 def health():
+    # Liveness: the process serves HTTP. Says nothing about the solver.
     return jsonify(status="ok"), 200
 
 
+@app.get("/api/health/ready")
+@limiter.exempt
+def ready():
+    # Readiness: only route traffic here once a dummy solve has succeeded
+    warmup.start()
+    startup = {"app_import_ms": APP_IMPORT_MS, **warmup.report()}
+    if not warmup.ready:
+        resp = jsonify(status=warmup.state, startup=startup)
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "1"
+        return resp
+    return jsonify(status="ready", startup=startup), 200
+
+
 @app.post("/api/optimize")
 def optimize():
+    # The common path pays one attribute check when profiling is off
+    if not profiles.enabled or not profiles.wants(request.headers):
+        return _optimize()
+
+    trace: dict = {}
+    prof = cProfile.Profile()
+    started = time.perf_counter()
+    prof.enable()
     try:
-        payload = request.get_json(force=True, silent=False)
+        resp = app.make_response(_optimize(trace))
+    finally:
+        prof.disable()
+    trace["status"] = resp.status_code
+    trace["wall_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    try:
+        resp.headers["X-Profile-Id"] = profiles.save(prof, trace)
     except Exception:
-        return (
-            jsonify(error="BAD_REQUEST", message="JSON ボディを解析できませんでした"),
-            400,
-        )
+        # Profiling is diagnostics only; never fail the request over it
+        logger.exception("failed to save profile")
+    return resp
+
+
+def _distance_matrix(points: List[Tuple[float, float]]) -> DistanceMatrix:
+    """Matrix for ``points`` from a snapshot when one covers them, else OSRM."""
+    if snapshots is not None:
+        points = snapshots.snap(points, Config.COORD_TOLERANCE_M)
+        dm = snapshots.lookup(points)
+        if dm is not None:
+            return dm
+    return get_distance_matrix(
+        osrm,
+        points,
+        (Config.TIMEOUT_CONNECT, Config.TIMEOUT_READ),
+        max_coords=Config.OSRM_TABLE_MAX_COORDS,
+    )
 
-    try:
-        req = OptimizeRequest(**payload)
-    except Exception as e:
-        return jsonify(error="VALIDATION_ERROR", message=str(e)), 400
 
-    if not (1 <= len(req.locations) <= Config.MAX_LOCATIONS):
+def _optimize(trace: Optional[dict] = None):
+    started = time.perf_counter()
+    if request.mimetype == PACKED_COORDS_MIMETYPE:
+        try:
+            coords = validate_packed_coords(request.get_data())
+            options = parse_optimize_options(request.args)
+        except Exception as e:
+            return jsonify(error="VALIDATION_ERROR", message=str(e)), 400
+    else:
+        try:
+            payload = request.get_json(force=True, silent=False)
+        except Exception:
+            return (
+                jsonify(error="BAD_REQUEST", message="JSON ボディを解析できませんでした"),
+                400,
+            )
+
+        try:
+            coords = validate_optimize_payload(payload)
+            options = parse_optimize_options(payload)
+        except Exception as e:
+            return jsonify(error="VALIDATION_ERROR", message=str(e)), 400
+
+    if not (1 <= len(coords) - 1 <= Config.MAX_LOCATIONS):
         return (
             jsonify(
                 error="INVALID_LOCATION_COUNT",
@@ -50,34 +201,149 @@ def optimize():
             400,
         )
 
-    coords = [(req.depot.lat, req.depot.lng)] + [
-        (loc.lat, loc.lng) for loc in req.locations
-    ]
+    # Shed before spending an OSRM call on a request we could not solve
+    try:
+        scheduler.check_admission(options.priority)
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    # Stops within a few centimetres of each other are one stop to OSRM and
+    # the solver; they are expanded back into the route afterwards.
+    stops, members = merge_colocated(coords[1:], Config.COORD_TOLERANCE_M)
+    points = [coords[0]] + stops
+    if trace is not None:
+        trace["fingerprint"] = request_fingerprint(coords)
+        trace["locations"] = len(coords) - 1
+        trace["priority"] = options.priority
 
     try:
-        dm = get_distance_matrix(
-            Config.OSRM_BASE_URL, coords, (Config.TIMEOUT_CONNECT, Config.TIMEOUT_READ)
-        )
+        dm = _distance_matrix(points)
     except OsrmError as e:
         return jsonify(error="OSRM_TABLE_FAILED", message=str(e)), 502
 
-    route, total = solve_tsp_distance_matrix(
-        dm, time_limit_ms=Config.SOLVER_TIME_LIMIT_MS
+    # With SOLVER_WARMUP=0 the first solve also starts warmup, so readiness
+    # is reported without waiting for a probe.
+    warmup.start()
+    from .solver import solve_tsp_with_stats
+
+    try:
+        with scheduler.slot(options.priority) as ticket:
+            learned_ms = budget.learned_ms(len(points))
+            # Time spent on OSRM and in the queue comes out of the solver's share
+            time_limit_ms = budget.time_limit_ms(
+                len(points),
+                elapsed_ms=(time.perf_counter() - started) * 1000,
+                max_latency_ms=options.max_latency_ms,
+                scale=ticket.budget_scale,
+            )
+            route, total, stats = solve_tsp_with_stats(
+                dm,
+                time_limit_ms=time_limit_ms,
+                neighbors=Config.SOLVER_NEIGHBORS or None,
+            )
+    except Overloaded as e:
+        return overloaded_response(e)
+    budget.record_solve(
+        stats.n, stats.time_to_best_ms, limit_ms=time_limit_ms, learned_ms=learned_ms
     )
+    if trace is not None:
+        trace["solver"] = dataclasses.asdict(stats)
+    route = expand_route(route, members)
 
     ordered = [coords[0]] + [coords[i + 1] for i in route] + [coords[0]]
+    route_started = time.perf_counter()
     try:
         legs = get_route_geometries(
-            Config.OSRM_BASE_URL,
+            osrm,
             ordered,
             (Config.TIMEOUT_CONNECT, Config.TIMEOUT_READ),
         )
     except OsrmError as e:
         return jsonify(error="OSRM_ROUTE_FAILED", message=str(e)), 502
+    budget.record_route_call((time.perf_counter() - route_started) * 1000)
 
-    return (
-        jsonify(route=route, total_distance=total, route_geometries=legs),
-        200,
+    return json_response(
+        {"route": route, "total_distance": total, "route_geometries": legs}
+    )
+
+
+@app.post("/api/insertions")
+def insertions():
+    """Cheapest position and cost increase for each candidate in the current route."""
+    try:
+        payload = request.get_json(force=True, silent=False)
+    except Exception:
+        return (
+            jsonify(error="BAD_REQUEST", message="JSON ボディを解析できませんでした"),
+            400,
+        )
+    try:
+        coords, n_route = validate_insertion_payload(payload)
+    except Exception as e:
+        return jsonify(error="VALIDATION_ERROR", message=str(e)), 400
+
+    try:
+        dm = _distance_matrix(coords)
+    except OsrmError as e:
+        return jsonify(error="OSRM_TABLE_FAILED", message=str(e)), 502
+
+    tour = list(range(1, n_route + 1))
+    candidates = list(range(n_route + 1, len(coords)))
+    positions, deltas = cheapest_insertions(dm, tour, candidates)
+    return json_response(
+        {
+            "base_distance": tour_costs(dm, [tour])[0],
+            "insertions": [
+                {"position": p, "delta": d} for p, d in zip(positions, deltas)
+            ],
+        }
+    )
+
+
+@app.post("/api/evaluate")
+def evaluate():
+    """Total distance of each candidate tour over the same locations."""
+    try:
+        payload = request.get_json(force=True, silent=False)
+    except Exception:
+        return (
+            jsonify(error="BAD_REQUEST", message="JSON ボディを解析できませんでした"),
+            400,
+        )
+    try:
+        coords, tours = validate_evaluate_payload(payload)
+    except Exception as e:
+        return jsonify(error="VALIDATION_ERROR", message=str(e)), 400
+
+    try:
+        dm = _distance_matrix(coords)
+    except OsrmError as e:
+        return jsonify(error="OSRM_TABLE_FAILED", message=str(e)), 502
+
+    # Tours index `locations`; matrix node 0 is the depot
+    nodes = [[i + 1 for i in tour] for tour in tours]
+    return json_response({"distances": tour_costs(dm, nodes)})
+
+
+@app.get("/api/profiles")
+def list_profiles():
+    if not profiles.authorized(request.headers):
+        abort(404)
+    return json_response({"profiles": profiles.list()})
+
+
+@app.get("/api/profiles/<pid>")
+def download_profile(pid: str):
+    if not profiles.authorized(request.headers):
+        abort(404)
+    path = profiles.dump_path(pid)
+    if path is None:
+        abort(404)
+    return send_file(
+        path,
+        mimetype="application/octet-stream",
+        as_attachment=True,
+        download_name=f"optimize-{pid}.prof",
     )
 
 
@@ -89,5 +355,8 @@ def ratelimit_handler(e):
     )
 
 
+APP_IMPORT_MS = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
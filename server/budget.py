@@ -0,0 +1,116 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class TimeBudgetPolicy:
+    """
+    Adaptive OR-Tools time limit.
+
+    Guided local search always runs until its time limit, but on small
+    problems it finds its final answer long before that. The policy keeps a
+    window of observed time-to-best per problem-size bucket (powers of two)
+    and grants ``headroom`` times its p95. Until a bucket has enough samples
+    a linear prior is used. The result is then capped by what is left of the
+    request's latency target after OSRM time already spent and the expected
+    route-geometry call that still follows.
+    """
+
+    def __init__(
+        self,
+        max_ms: int,
+        min_ms: int = 100,
+        slo_ms: int = 5000,
+        headroom: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+    ):
+        self.max_ms = int(max_ms)
+        self.min_ms = min(int(min_ms), self.max_ms)
+        self.slo_ms = int(slo_ms)
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.window = window
+        self._samples: Dict[int, Deque[float]] = {}
+        # EWMA of the OSRM route call that follows the solve
+        self._route_ms: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bucket(n: int) -> int:
+        return max(int(n), 1).bit_length()
+
+    @staticmethod
+    def prior_ms(n: int) -> float:
+        return 100.0 + 50.0 * n
+
+    def learned_ms(self, n: int) -> float:
+        """Budget for an n-node problem from recorded stats (or the prior)."""
+        with self._lock:
+            samples = list(self._samples.get(self.bucket(n), ()))
+        if len(samples) < self.min_samples:
+            return self.prior_ms(n)
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        return p95 * self.headroom
+
+    def time_limit_ms(
+        self,
+        n: int,
+        elapsed_ms: float = 0.0,
+        max_latency_ms: Optional[int] = None,
+        scale: float = 1.0,
+    ) -> int:
+        """
+        ``scale`` shrinks the learned budget, e.g. under queue pressure; the
+        latency cap still applies on top of it.
+        """
+        slo = self.slo_ms if max_latency_ms is None else int(max_latency_ms)
+        with self._lock:
+            reserve = self._route_ms or 0.0
+        remaining = slo - elapsed_ms - reserve
+        limit = min(self.learned_ms(n) * scale, remaining, self.max_ms)
+        # OR-Tools needs some time to produce even a first solution
+        return int(max(limit, self.min_ms))
+
+    def record_solve(
+        self,
+        n: int,
+        time_to_best_ms: Optional[float],
+        limit_ms: Optional[int] = None,
+        learned_ms: Optional[float] = None,
+    ) -> None:
+        """
+        Record a solve's time-to-best. Pass the granted ``limit_ms`` and the
+        ``learned_ms`` it was derived from: time-to-best cannot exceed the
+        limit, so a solve cut short by the latency target or queue pressure
+        is censored and would drag the p95 down. Such samples are dropped.
+        The ``max_ms`` cap is permanent configuration and does not censor.
+        """
+        if time_to_best_ms is None:
+            return
+        if limit_ms is not None and learned_ms is not None:
+            if limit_ms < int(min(learned_ms, self.max_ms)):
+                return
+        with self._lock:
+            samples = self._samples.setdefault(
+                self.bucket(n), deque(maxlen=self.window)
+            )
+            samples.append(float(time_to_best_ms))
+
+    def record_route_call(self, elapsed_ms: float, alpha: float = 0.2) -> None:
+        with self._lock:
+            if self._route_ms is None:
+                self._route_ms = float(elapsed_ms)
+            else:
+                self._route_ms += alpha * (elapsed_ms - self._route_ms)
+
+    def table(self) -> Dict[int, dict]:
+        """Current per-bucket state, keyed by the bucket's largest size."""
+        with self._lock:
+            buckets = {b: list(s) for b, s in self._samples.items()}
+        out = {}
+        for b, samples in sorted(buckets.items()):
+            n_max = (1 << b) - 1
+            out[n_max] = {"samples": len(samples), "budget_ms": self.learned_ms(n_max)}
+        return out
@@ -1,11 +1,60 @@
 import os
+from typing import Optional
+
+
+def _optional_float(name: str, default: str) -> Optional[float]:
+    value = os.getenv(name, default)
+    return float(value) if value else None
 
 
 class Config:
+    # Comma-separated list enables failover and hedged requests
     OSRM_BASE_URL = os.getenv("OSRM_BASE_URL", "https://router.project-osrm.org")
+    OSRM_BASE_URLS = [u.strip() for u in OSRM_BASE_URL.split(",") if u.strip()]
+    # Latency percentile after which a duplicate request is sent; empty disables
+    OSRM_HEDGE_PERCENTILE = _optional_float("OSRM_HEDGE_PERCENTILE", "95")
+    OSRM_HEDGE_INITIAL_MS = float(os.getenv("OSRM_HEDGE_INITIAL_MS", "500"))
+    OSRM_FAILURE_THRESHOLD = int(os.getenv("OSRM_FAILURE_THRESHOLD", "3"))
+    OSRM_COOLDOWN_S = float(os.getenv("OSRM_COOLDOWN_S", "30"))
+    # Threads for OSRM calls when several backends are configured: enough for
+    # every request thread (GUNICORN_THREADS) plus one hedge each
+    OSRM_MAX_WORKERS = int(
+        os.getenv(
+            "OSRM_MAX_WORKERS", str(2 * int(os.getenv("GUNICORN_THREADS", "32")))
+        )
+    )
     MAX_LOCATIONS = int(os.getenv("MAX_LOCATIONS", "10"))
+    # Candidate tours accepted by one /api/evaluate request
+    MAX_EVAL_TOURS = int(os.getenv("MAX_EVAL_TOURS", "1000"))
     TIMEOUT_CONNECT = float(os.getenv("TIMEOUT_CONNECT", "3.0"))
     TIMEOUT_READ = float(os.getenv("TIMEOUT_READ", "5.0"))
     RATE_LIMIT_RULE = os.getenv("RATE_LIMIT_RULE", "60/minute")
+    # Upper bound for the adaptive solver budget (see server/budget.py)
     SOLVER_TIME_LIMIT_MS = int(os.getenv("SOLVER_TIME_LIMIT_MS", "3000"))
-
+    SOLVER_MIN_TIME_MS = int(os.getenv("SOLVER_MIN_TIME_MS", "100"))
+    # Restrict each stop's successors to its k nearest (0 disables, see solver.py)
+    SOLVER_NEIGHBORS = int(os.getenv("SOLVER_NEIGHBORS", "0"))
+    # Concurrent solves per process (default: one per core) and queue limits
+    SOLVER_MAX_CONCURRENT = int(
+        os.getenv("SOLVER_MAX_CONCURRENT", str(os.cpu_count() or 1))
+    )
+    SOLVER_MAX_QUEUE = int(os.getenv("SOLVER_MAX_QUEUE", "16"))
+    SOLVER_MAX_QUEUE_WAIT_S = float(os.getenv("SOLVER_MAX_QUEUE_WAIT_S", "5"))
+    # Import OR-Tools and run a dummy solve in the background at startup;
+    # when off, the first readiness probe or solve triggers it instead
+    SOLVER_WARMUP = os.getenv("SOLVER_WARMUP", "1").lower() not in ("0", "false", "no")
+    # Default end-to-end target when the client sends no max_latency_ms
+    LATENCY_SLO_MS = int(os.getenv("LATENCY_SLO_MS", "5000"))
+    # Largest table request sent to OSRM; bigger matrices are fetched in tiles
+    OSRM_TABLE_MAX_COORDS = int(os.getenv("OSRM_TABLE_MAX_COORDS", "100"))
+    # Stops closer than this (metres) are merged and snapped to known points
+    COORD_TOLERANCE_M = float(os.getenv("COORD_TOLERANCE_M", "1.0"))
+    # Per-request profiling (see server/profiling.py); off unless one is set
+    PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+    PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+    # Directory of precomputed matrices (see server/snapshot.py); empty disables
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+    # How often the snapshot directory is re-scanned for rebuilds (seconds)
+    SNAPSHOT_RELOAD_S = float(os.getenv("SNAPSHOT_RELOAD_S", "5"))
@@ -0,0 +1,132 @@
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+
+DTYPE = np.float64
+
+
+class DistanceMatrix:
+    """
+    Square cost matrix packed into a flat float64 buffer.
+
+    The buffer is either a private NumPy array or a block of
+    ``multiprocessing.shared_memory``. Shared matrices pickle as their
+    segment name, so handing one to a worker process costs a few bytes
+    instead of a copy of the whole matrix.
+    """
+
+    def __init__(
+        self,
+        array: np.ndarray,
+        shm: Optional[shared_memory.SharedMemory] = None,
+    ):
+        if array.ndim != 2 or array.shape[0] != array.shape[1]:
+            raise ValueError(f"distance matrix must be square, got {array.shape}")
+        self._array = array
+        self._shm = shm
+
+    @classmethod
+    def empty(cls, n: int, shared: bool = False) -> "DistanceMatrix":
+        if not shared:
+            return cls(np.zeros((n, n), dtype=DTYPE))
+        nbytes = max(n * n * np.dtype(DTYPE).itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        array = np.ndarray((n, n), dtype=DTYPE, buffer=shm.buf)
+        array.fill(0)
+        return cls(array, shm)
+
+    @classmethod
+    def from_rows(
+        cls, rows: Sequence[Sequence[Optional[float]]], shared: bool = False
+    ) -> "DistanceMatrix":
+        # None (OSRM's "no route") becomes NaN so callers can detect it
+        src = np.array(rows, dtype=DTYPE)
+        n = len(rows)
+        if n == 0:
+            src = src.reshape(0, 0)
+        if src.ndim != 2 or src.shape != (n, n):
+            raise ValueError(f"distance matrix must be square, got {src.shape}")
+        if not shared:
+            return cls(src)
+        dm = cls.empty(n, shared=True)
+        dm._array[...] = src
+        return dm
+
+    @classmethod
+    def attach(cls, name: str, n: int) -> "DistanceMatrix":
+        """Map an existing shared-memory matrix created by another process."""
+        shm = shared_memory.SharedMemory(name=name)
+        array = np.ndarray((n, n), dtype=DTYPE, buffer=shm.buf)
+        return cls(array, shm)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Underlying ``(n, n)`` array view (no copy)."""
+        return self._array
+
+    @property
+    def shm_name(self) -> Optional[str]:
+        return self._shm.name if self._shm is not None else None
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._array.nbytes)
+
+    def __len__(self) -> int:
+        return self._array.shape[0]
+
+    def __getitem__(self, i):
+        return self._array[i]
+
+    def __iter__(self):
+        return iter(self._array)
+
+    def __repr__(self) -> str:
+        where = f"shm={self.shm_name!r}" if self._shm is not None else "private"
+        return f"DistanceMatrix(n={len(self)}, {where})"
+
+    def __reduce__(self):
+        if self._shm is not None:
+            return (DistanceMatrix.attach, (self._shm.name, len(self)))
+        return (DistanceMatrix, (self._array,))
+
+    def has_missing(self) -> bool:
+        return bool(np.isnan(self._array).any())
+
+    def to_costs(self) -> np.ndarray:
+        """Integer arc costs, truncated towards zero like ``int()``."""
+        # NaN would cast to INT64_MIN and silently become the cheapest arc
+        if self.has_missing():
+            raise ValueError("distance matrix has missing (unreachable) entries")
+        return np.trunc(self._array).astype(np.int64)
+
+    def tolist(self) -> List[List[float]]:
+        return self._array.tolist()
+
+    def close(self) -> None:
+        if self._shm is not None:
+            # Drop our view before releasing the mapping
+            self._array = np.zeros((0, 0), dtype=DTYPE)
+            self._shm.close()
+
+    def unlink(self) -> None:
+        """Free the shared segment. Only the creating process should call this."""
+        if self._shm is not None:
+            self._shm.unlink()
+
+    def __enter__(self) -> "DistanceMatrix":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+MatrixLike = Union[DistanceMatrix, Sequence[Sequence[float]]]
+
+
+def as_distance_matrix(m: MatrixLike) -> DistanceMatrix:
+    if isinstance(m, DistanceMatrix):
+        return m
+    return DistanceMatrix.from_rows(m)
@@ -0,0 +1,205 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Deque, Dict, List, Optional, Sequence
+
+import requests
+
+
+class Backend:
+    """One OSRM endpoint with its recent latency and health."""
+
+    def __init__(self, url: str, window: int = 100):
+        self.url = url.rstrip("/")
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.ewma_ms: Optional[float] = None
+        self.failures = 0
+        self.down_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def percentile_ms(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(q / 100.0 * len(samples)))]
+
+    def __repr__(self) -> str:
+        return f"Backend({self.url!r}, ewma_ms={self.ewma_ms}, failures={self.failures})"
+
+
+class OsrmBackends:
+    """
+    A set of interchangeable OSRM endpoints.
+
+    Each call goes to a healthy backend picked at random with weight
+    ``1 / latency``. If it has not answered once the backend's
+    ``hedge_percentile`` latency has elapsed, a duplicate is sent to another
+    backend and the first good response wins; the loser's response is closed
+    when it arrives (a blocking ``requests`` call cannot be interrupted, its
+    read timeout bounds it). Connection errors and 5xx responses fail over to
+    the next backend. ``failure_threshold`` consecutive failures take a
+    backend out of rotation for ``cooldown_s``.
+
+    Attempts run on a shared pool of ``max_workers`` threads, which should
+    cover the server's request concurrency plus one hedge per request. The
+    hedge delay is measured from when an attempt actually starts, so time
+    spent queued for a worker never triggers a hedge.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        hedge_percentile: Optional[float] = 95.0,
+        hedge_initial_ms: float = 500.0,
+        hedge_min_samples: int = 10,
+        failure_threshold: int = 3,
+        cooldown_s: float = 30.0,
+        max_workers: Optional[int] = None,
+    ):
+        if not urls:
+            raise ValueError("at least one OSRM backend URL is required")
+        self.backends = [Backend(u) for u in urls]
+        self.hedge_percentile = hedge_percentile
+        self.hedge_initial_ms = hedge_initial_ms
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._executor = (
+            ThreadPoolExecutor(
+                max_workers=max_workers or 4 * len(urls), thread_name_prefix="osrm"
+            )
+            if len(urls) > 1
+            else None
+        )
+
+    @property
+    def primary_url(self) -> str:
+        return self.backends[0].url
+
+    def choose(self, exclude: Sequence[Backend] = ()) -> Optional[Backend]:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                return None
+            healthy = [b for b in candidates if b.healthy(now)]
+            if not healthy:
+                # Everything is cooling down: probe the one that recovers first
+                return min(candidates, key=lambda b: b.down_until)
+            known = [b.ewma_ms for b in healthy if b.ewma_ms is not None]
+            # Untried backends get the best observed latency so they get probed
+            default = min(known) if known else 1.0
+            weights = [1.0 / max(b.ewma_ms or default, 1.0) for b in healthy]
+        return random.choices(healthy, weights=weights)[0]
+
+    def _hedge_delay_s(self, backend: Backend) -> Optional[float]:
+        if self.hedge_percentile is None or len(self.backends) < 2:
+            return None
+        with self._lock:
+            if len(backend.latencies) < self.hedge_min_samples:
+                delay = self.hedge_initial_ms
+            else:
+                delay = backend.percentile_ms(self.hedge_percentile)
+        return delay / 1000.0
+
+    def _record(self, backend: Backend, ok: bool, elapsed_ms: float) -> None:
+        with self._lock:
+            if ok:
+                backend.failures = 0
+                backend.down_until = 0.0
+                backend.latencies.append(elapsed_ms)
+                if backend.ewma_ms is None:
+                    backend.ewma_ms = elapsed_ms
+                else:
+                    backend.ewma_ms += 0.2 * (elapsed_ms - backend.ewma_ms)
+            else:
+                backend.failures += 1
+                if backend.failures >= self.failure_threshold:
+                    backend.down_until = time.monotonic() + self.cooldown_s
+
+    def _call(
+        self, backend: Backend, path: str, timeout: tuple[float, float], stream: bool
+    ) -> requests.Response:
+        t0 = time.perf_counter()
+        try:
+            resp = requests.get(f"{backend.url}{path}", timeout=timeout, stream=stream)
+            if resp.status_code >= 500:
+                try:
+                    resp.raise_for_status()
+                finally:
+                    resp.close()
+        except requests.RequestException:
+            self._record(backend, False, 0.0)
+            raise
+        self._record(backend, True, (time.perf_counter() - t0) * 1000)
+        return resp
+
+    def get(
+        self, path: str, timeout: tuple[float, float], stream: bool = False
+    ) -> requests.Response:
+        """GET ``path`` (everything after the base URL) from the best backend."""
+        if self._executor is None:
+            return self._call(self.backends[0], path, timeout, stream)
+
+        tried: List[Backend] = []
+        inflight: Dict[Future, Backend] = {}
+        started_at: Dict[int, float] = {}
+        primary_started = threading.Event()
+        last_exc: Optional[requests.RequestException] = None
+
+        def attempt(backend: Backend, n: int) -> requests.Response:
+            started_at[n] = time.monotonic()
+            if n == 0:
+                primary_started.set()
+            return self._call(backend, path, timeout, stream)
+
+        def launch() -> bool:
+            backend = self.choose(exclude=tried)
+            if backend is None:
+                return False
+            tried.append(backend)
+            inflight[self._executor.submit(attempt, backend, len(tried) - 1)] = backend
+            return True
+
+        launch()
+        hedge_at = self._hedge_delay_s(tried[0])
+        hedged = False
+        while inflight:
+            wait_s = None
+            if not hedged and hedge_at is not None:
+                # Time queued for a worker does not count towards the hedge
+                primary_started.wait()
+                wait_s = max(0.0, hedge_at - (time.monotonic() - started_at[0]))
+            done, _ = wait(list(inflight), timeout=wait_s, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                launch()
+                continue
+            for fut in done:
+                inflight.pop(fut)
+                try:
+                    resp = fut.result()
+                except requests.RequestException as e:
+                    last_exc = e
+                    continue
+                for loser in inflight:
+                    loser.cancel()
+                    loser.add_done_callback(_close_result)
+                return resp
+            if not inflight:
+                # Every attempt so far failed: fail over to the next backend
+                hedged = True
+                launch()
+        assert last_exc is not None
+        raise last_exc
+
+
+def _close_result(fut: Future) -> None:
+    if fut.cancelled() or fut.exception() is not None:
+        return
+    fut.result().close()
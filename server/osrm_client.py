@@ -1,44 +1,156 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import requests
 
+from . import osrm_json
+from .matrix import DistanceMatrix
+from .osrm_backends import OsrmBackends
+
+
+TABLE_CHUNK_SIZE = 64 * 1024
+
+# OSRM `annotations` value -> response field
+_ANNOTATION_KEYS = {"distance": "distances", "duration": "durations"}
+
+
+# A single base URL or a pool of interchangeable backends
+OsrmBase = Union[str, OsrmBackends]
+
 
 class OsrmError(Exception):
     pass
 
 
+def _http_get(
+    base: OsrmBase, path: str, timeout: tuple[float, float], stream: bool = False
+) -> requests.Response:
+    if isinstance(base, OsrmBackends):
+        return base.get(path, timeout, stream=stream)
+    return requests.get(f"{base}{path}", timeout=timeout, stream=stream)
+
+
 def _coords_to_path(coords: List[Tuple[float, float]]) -> str:
     # OSRM expects: lon,lat;lon,lat;...
     return ";".join([f"{lng},{lat}" for lat, lng in coords])
 
 
-def get_distance_matrix(
-    base_url: str, coords: List[Tuple[float, float]], timeout: tuple[float, float]
-) -> List[List[int]]:
+def _fetch_table_tile(
+    base_url: OsrmBase,
+    coords: List[Tuple[float, float]],
+    timeout: tuple[float, float],
+    annotations: Sequence[str],
+    outs: Dict[str, np.ndarray],
+    n_sources: Optional[int] = None,
+) -> None:
     path = _coords_to_path(coords)
-    url = f"{base_url}/table/v1/driving/{path}?annotations=distance"
+    resource = f"/table/v1/driving/{path}?annotations={','.join(annotations)}"
+    if n_sources is not None:
+        sources = ";".join(str(i) for i in range(n_sources))
+        destinations = ";".join(str(i) for i in range(n_sources, len(coords)))
+        resource += f"&sources={sources}&destinations={destinations}"
+    cells = sum(out.size for out in outs.values())
     try:
-        resp = requests.get(url, timeout=timeout)
+        resp = _http_get(base_url, resource, timeout, stream=True)
         resp.raise_for_status()
+        if osrm_json.has_fast_path() and cells <= osrm_json.FAST_PATH_MAX_CELLS:
+            data = osrm_json.loads(resp.content)
+            found = {k for k in outs if isinstance(data, dict) and k in data}
+            for key in found:
+                outs[key][...] = np.array(data[key], dtype=np.float64)
+        else:
+            found = osrm_json.parse_table(
+                resp.iter_content(chunk_size=TABLE_CHUNK_SIZE), outs
+            )
     except requests.RequestException as e:
         raise OsrmError(f"OSRM table request failed: {e}")
-    data = resp.json()
-    if "distances" not in data:
-        raise OsrmError("OSRM table response missing 'distances'")
-    return data["distances"]
+    except (TypeError, ValueError) as e:
+        raise OsrmError(f"OSRM table response is malformed: {e}")
+    for key in outs:
+        if key not in found:
+            raise OsrmError(f"OSRM table response missing '{key}'")
+
+
+def _table_tiles(n: int, max_coords: Optional[int]):
+    """
+    Yield ``(rows, cols)`` slices covering an n x n table so that no request
+    carries more than ``max_coords`` coordinates.
+    """
+    if max_coords is None or n <= max_coords:
+        yield slice(0, n), slice(0, n)
+        return
+    block = max(max_coords // 2, 1)
+    for i in range(0, n, block):
+        for j in range(0, n, block):
+            yield slice(i, min(i + block, n)), slice(j, min(j + block, n))
+
+
+def get_table(
+    base_url: OsrmBase,
+    coords: List[Tuple[float, float]],
+    timeout: tuple[float, float],
+    annotations: Sequence[str] = ("distance",),
+    shared: bool = False,
+    max_coords: Optional[int] = None,
+) -> Dict[str, DistanceMatrix]:
+    """
+    Fetch OSRM table annotations (``"distance"``, ``"duration"``) for coords.
+
+    Returns matrices keyed by OSRM's response field (``"distances"``,
+    ``"durations"``). Responses are decoded directly into the matrices'
+    buffers; when ``max_coords`` is set, larger tables are fetched tile by
+    tile and each tile is written into its slice in place.
+    """
+    n = len(coords)
+    keys = [_ANNOTATION_KEYS[a] for a in annotations]
+    mats = {k: DistanceMatrix.empty(n, shared=shared) for k in keys}
+    try:
+        for rows, cols in _table_tiles(n, max_coords):
+            outs = {k: m.values[rows, cols] for k, m in mats.items()}
+            if rows == cols:
+                _fetch_table_tile(base_url, coords[rows], timeout, annotations, outs)
+            else:
+                _fetch_table_tile(
+                    base_url,
+                    coords[rows] + coords[cols],
+                    timeout,
+                    annotations,
+                    outs,
+                    n_sources=rows.stop - rows.start,
+                )
+        if any(m.has_missing() for m in mats.values()):
+            raise OsrmError("OSRM table response contains unreachable pairs")
+    except Exception:
+        for m in mats.values():
+            m.close()
+            m.unlink()
+        raise
+    return mats
+
+
+def get_distance_matrix(
+    base_url: OsrmBase,
+    coords: List[Tuple[float, float]],
+    timeout: tuple[float, float],
+    shared: bool = False,
+    max_coords: Optional[int] = None,
+) -> DistanceMatrix:
+    return get_table(
+        base_url, coords, timeout, shared=shared, max_coords=max_coords
+    )["distances"]
 
 
 def get_route_geometries(
-    base_url: str, coords: List[Tuple[float, float]], timeout: tuple[float, float]
+    base_url: OsrmBase, coords: List[Tuple[float, float]], timeout: tuple[float, float]
 ) -> List[str]:
     path = _coords_to_path(coords)
-    url = f"{base_url}/route/v1/driving/{path}?overview=full&geometries=polyline6"
+    resource = f"/route/v1/driving/{path}?overview=full&geometries=polyline6"
     try:
-        resp = requests.get(url, timeout=timeout)
+        resp = _http_get(base_url, resource, timeout)
         resp.raise_for_status()
     except requests.RequestException as e:
         raise OsrmError(f"OSRM route request failed: {e}")
-    data = resp.json()
+    data = osrm_json.loads(resp.content)
     if "routes" not in data or not data["routes"]:
         raise OsrmError("OSRM route response missing 'routes'")
 
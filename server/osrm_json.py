@@ -0,0 +1,152 @@
+import json
+import re
+import warnings
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional fast path
+    orjson = None
+
+
+# Below this many cells a full decode with orjson is faster than streaming and
+# the temporary Python floats are small enough not to matter.
+FAST_PATH_MAX_CELLS = 250_000
+
+_ARRAY_END = re.compile(rb"\]\s*\]")
+
+
+def loads(raw: bytes) -> Any:
+    """Decode a JSON document, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def has_fast_path() -> bool:
+    return orjson is not None
+
+
+def _parse_numbers(body: bytes) -> np.ndarray:
+    body = body.translate(None, b"[]").strip()
+    if not body.strip(b", \t\r\n"):
+        return np.empty(0, dtype=np.float64)
+    text = body.replace(b"null", b"nan").decode("ascii")
+    expected = text.count(",") + 1
+    with warnings.catch_warnings():
+        # fromstring warns (instead of raising) on trailing garbage
+        warnings.simplefilter("ignore", DeprecationWarning)
+        values = np.fromstring(text, dtype=np.float64, sep=",")
+    if values.size != expected:
+        raise ValueError("non-numeric value in matrix")
+    return values
+
+
+class _Target:
+    def __init__(self, out: np.ndarray):
+        if out.ndim != 2:
+            raise ValueError("target must be a 2-D array")
+        self.out = out
+        self.cols = out.shape[1]
+        self.size = out.size
+        self.flat = out.reshape(-1) if out.flags.c_contiguous else None
+        self.cursor = 0
+
+    def write(self, values: np.ndarray) -> None:
+        end = self.cursor + values.size
+        if end > self.size:
+            raise ValueError("matrix has more cells than expected")
+        if self.flat is not None:
+            self.flat[self.cursor:end] = values
+        else:
+            # Strided view (e.g. a tile of a larger matrix): scatter row-wise
+            idx = np.arange(self.cursor, end)
+            self.out[idx // self.cols, idx % self.cols] = values
+        self.cursor = end
+
+
+class TableStreamParser:
+    """
+    Incremental decoder for OSRM table responses.
+
+    Feed it the response body chunk by chunk; the numeric arrays named in
+    ``targets`` (e.g. ``"distances"``) are decoded straight into the given
+    preallocated 2-D arrays, which may be views into a larger matrix. No
+    per-cell Python objects are created. ``null`` cells become NaN. Other
+    keys are skipped.
+    """
+
+    def __init__(self, targets: Dict[str, np.ndarray]):
+        self._targets = {k: _Target(v) for k, v in targets.items()}
+        self._keys = {k: f'"{k}"'.encode() for k in targets}
+        self._done: set[str] = set()
+        self._current: Optional[str] = None
+        self._buf = b""
+        self._keep = max((len(k) for k in self._keys.values()), default=0) + 64
+
+    def feed(self, chunk: bytes) -> None:
+        self._buf += chunk
+        while self._buf:
+            if self._current is None:
+                if not self._seek_key():
+                    return
+            elif not self._consume_array():
+                return
+
+    def _seek_key(self) -> bool:
+        best = None
+        for key, pattern in self._keys.items():
+            if key in self._done:
+                continue
+            pos = self._buf.find(pattern)
+            if pos >= 0 and (best is None or pos < best[1]):
+                best = (key, pos + len(pattern))
+        if best is None:
+            # Keep a tail in case a key straddles two chunks
+            self._buf = self._buf[-self._keep:] if len(self._done) < len(self._keys) else b""
+            return False
+        key, after = best
+        start = self._buf.find(b"[", after)
+        if start < 0 or self._buf[after:start].strip() != b":":
+            if start < 0:
+                return False
+            # "distances" appeared somewhere other than as an object key
+            self._buf = self._buf[after:]
+            return True
+        self._current = key
+        self._buf = self._buf[start:]
+        return True
+
+    def _consume_array(self) -> bool:
+        target = self._targets[self._current]
+        m = _ARRAY_END.search(self._buf)
+        if m is not None:
+            target.write(_parse_numbers(self._buf[: m.start()]))
+            self._buf = self._buf[m.end():]
+            if target.cursor != target.size:
+                raise ValueError(f"'{self._current}' has the wrong number of cells")
+            self._done.add(self._current)
+            self._current = None
+            return True
+        # Only decode up to the last separator so no number is split
+        cut = self._buf.rfind(b",")
+        if cut > 0:
+            target.write(_parse_numbers(self._buf[:cut]))
+            self._buf = self._buf[cut + 1:]
+        return False
+
+    def close(self) -> set[str]:
+        """Return the keys that were fully decoded."""
+        if self._current is not None:
+            raise ValueError(f"'{self._current}' array is truncated")
+        return set(self._done)
+
+
+def parse_table(chunks: Iterable[bytes], targets: Dict[str, np.ndarray]) -> set[str]:
+    parser = TableStreamParser(targets)
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+    return parser.close()
@@ -0,0 +1,105 @@
+"""
+Opt-in per-request profiling for /api/optimize.
+
+A request is profiled when it carries ``X-Profile-Token`` matching
+``PROFILE_TOKEN`` or is picked by ``PROFILE_SAMPLE_RATE``. The whole
+request (validation, OSRM calls, solve) runs under cProfile and the result
+is written to ``PROFILE_DIR`` as a pstats dump next to a JSON record of the
+request fingerprint and solver stats. Dumps can be downloaded from
+``/api/profiles/<id>`` and opened with ``python -m pstats``, snakeviz or
+converted to a flame graph (e.g. flameprof).
+
+Only the request thread is profiled; hedged OSRM calls running on the
+backend pool's threads show up as time spent waiting.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+PROFILE_HEADER = "X-Profile-Token"
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def request_fingerprint(coords: Sequence[Tuple[float, float]]) -> str:
+    """Stable hash of a request's coordinates (6 decimals, input order)."""
+    canon = ";".join(f"{lat:.6f},{lng:.6f}" for lat, lng in coords)
+    return hashlib.sha256(canon.encode()).hexdigest()[:16]
+
+
+class ProfileStore:
+    def __init__(
+        self, root: str, token: str = "", sample_rate: float = 0.0, keep: int = 50
+    ):
+        self.root = Path(root)
+        self.token = token
+        self.sample_rate = sample_rate
+        self.keep = keep
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token) or self.sample_rate > 0
+
+    def authorized(self, headers: Mapping[str, str]) -> bool:
+        supplied = headers.get(PROFILE_HEADER)
+        return bool(self.token and supplied) and hmac.compare_digest(
+            supplied.encode(), self.token.encode()
+        )
+
+    def wants(self, headers: Mapping[str, str]) -> bool:
+        if self.authorized(headers):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def save(self, prof: cProfile.Profile, record: dict) -> str:
+        self.root.mkdir(parents=True, exist_ok=True)
+        pid = uuid.uuid4().hex
+        prof.dump_stats(str(self.root / f"{pid}.prof"))
+        record = {"id": pid, "created_at": time.time(), **record}
+        (self.root / f"{pid}.json").write_text(json.dumps(record, ensure_ascii=False))
+        self._prune()
+        return pid
+
+    def _prune(self) -> None:
+        records = []
+        for path in self.root.glob("*.json"):
+            try:
+                records.append((path.stat().st_mtime, path))
+            except OSError:
+                # Pruned by a concurrent request between glob and stat
+                continue
+        records.sort()
+        for _, old in records[: max(len(records) - self.keep, 0)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".prof").unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        if not self.root.exists():
+            return []
+        out = []
+        for p in self.root.glob("*.json"):
+            try:
+                out.append(json.loads(p.read_text()))
+            except (OSError, ValueError):
+                continue
+        return sorted(out, key=lambda r: r.get("created_at", 0), reverse=True)
+
+    def dump_path(self, pid: str) -> Optional[Path]:
+        if not _ID_RE.match(pid):
+            return None
+        path = self.root / f"{pid}.prof"
+        return path if path.exists() else None
+
+
+def default_profile_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), "route-chan-profiles")
@@ -0,0 +1,143 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after_s: float):
+        super().__init__(f"solver overloaded, retry after {retry_after_s:.1f}s")
+        self.retry_after_s = retry_after_s
+
+
+class Ticket:
+    """Handed to an admitted request; carries the pressure at admission."""
+
+    def __init__(self, priority: str, queued_ahead: int, waited_ms: float, scale: float):
+        self.priority = priority
+        self.queued_ahead = queued_ahead
+        self.waited_ms = waited_ms
+        # Multiply the solver budget by this to drain the queue faster
+        self.budget_scale = scale
+
+
+class SolveScheduler:
+    """
+    Admission control for CPU-bound solves.
+
+    At most ``max_concurrent`` solves run at once. Further requests wait in
+    a priority queue (interactive before batch, FIFO within a class). A
+    request is shed up front with a retry-after hint when its class's queue
+    is full or the estimated wait exceeds ``max_wait_s``, instead of letting
+    every request slow down together. Admitted requests get a smaller solver
+    budget while others are queued behind them.
+
+    State is per process, so the server must run as a single process that
+    handles requests on threads (gunicorn ``-w 1 -k gthread``); with
+    several sync workers each one would only ever see its own request.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int = 16,
+        max_batch_queue: Optional[int] = None,
+        max_wait_s: float = 5.0,
+        min_budget_scale: float = 0.25,
+    ):
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self.max_queue = {
+            "interactive": max_queue,
+            "batch": max_queue // 2 if max_batch_queue is None else max_batch_queue,
+        }
+        self.max_wait_s = max_wait_s
+        self.min_budget_scale = min_budget_scale
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting: List[Tuple[int, int]] = []
+        self._queued: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._seq = itertools.count()
+        # EWMA of slot hold time, used to estimate queueing delay
+        self._service_s = 1.0
+
+    def _estimated_wait_s(self, ahead: int) -> float:
+        return (ahead + 1) * self._service_s / self.max_concurrent
+
+    def _ahead_of(self, priority: str) -> int:
+        rank = PRIORITIES[priority]
+        return sum(n for p, n in self._queued.items() if PRIORITIES[p] <= rank)
+
+    def check_admission(self, priority: str = "interactive") -> None:
+        """Raise `Overloaded` now if a solve at this priority would be shed."""
+        with self._cond:
+            self._check(priority)
+
+    def _check(self, priority: str) -> None:
+        if self._running < self.max_concurrent and not self._waiting:
+            return
+        ahead = self._ahead_of(priority)
+        wait_s = self._estimated_wait_s(ahead)
+        if self._queued[priority] >= self.max_queue[priority] or wait_s > self.max_wait_s:
+            raise Overloaded(max(wait_s, 1.0))
+
+    def _budget_scale(self) -> float:
+        backlog = sum(self._queued.values())
+        return max(self.min_budget_scale, 1.0 / (1.0 + backlog / self.max_concurrent))
+
+    @contextmanager
+    def slot(self, priority: str = "interactive") -> Iterator[Ticket]:
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority: {priority!r}")
+        t0 = time.monotonic()
+        with self._cond:
+            self._check(priority)
+            entry = (PRIORITIES[priority], next(self._seq))
+            heapq.heappush(self._waiting, entry)
+            self._queued[priority] += 1
+            ahead = self._ahead_of(priority) - 1
+            try:
+                deadline = t0 + self.max_wait_s
+                while not (
+                    self._waiting[0] == entry and self._running < self.max_concurrent
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Overloaded(self._estimated_wait_s(ahead))
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._queued[priority] -= 1
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self._queued[priority] -= 1
+            self._running += 1
+            ticket = Ticket(
+                priority, ahead, (time.monotonic() - t0) * 1000, self._budget_scale()
+            )
+            # The next waiter may also fit if several slots are free
+            self._cond.notify_all()
+
+        started = time.monotonic()
+        try:
+            yield ticket
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._service_s += 0.2 * ((time.monotonic() - started) - self._service_s)
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "running": self._running,
+                "max_concurrent": self.max_concurrent,
+                "queued": dict(self._queued),
+                "service_s": round(self._service_s, 3),
+            }
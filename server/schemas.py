@@ -1,5 +1,6 @@
-from typing import List
+from typing import Any, Callable, List, Literal, Optional, Tuple
 
+import numpy as np
 from pydantic import BaseModel, Field
 
 try:
@@ -17,7 +18,14 @@ class LatLng(BaseModel):
     lng: float = Field(..., ge=-180, le=180)
 
 
-class OptimizeRequest(BaseModel):
+class OptimizeOptions(BaseModel):
+    # End-to-end latency the client is willing to wait for, in milliseconds
+    max_latency_ms: Optional[int] = Field(None, gt=0)
+    # Interactive (UI) solves are admitted ahead of batch ones under load
+    priority: Literal["interactive", "batch"] = "interactive"
+
+
+class OptimizeRequest(OptimizeOptions):
     depot: LatLng
     locations: List[LatLng]
 
@@ -30,8 +38,189 @@ class OptimizeRequest(BaseModel):
         return v
 
 
+class InsertionRequest(BaseModel):
+    depot: LatLng
+    # Stops of the current tour in visit order (may be empty)
+    route: List[LatLng] = Field(default_factory=list)
+    candidates: List[LatLng]
+
+    @validator("route")
+    def check_route(cls, v: List[LatLng]):
+        if len(v) > Config.MAX_LOCATIONS:
+            raise ValueError(
+                f"経路の地点は{Config.MAX_LOCATIONS}以下で設定してください"
+            )
+        return v
+
+    @validator("candidates")
+    def check_candidates(cls, v: List[LatLng]):
+        if not (1 <= len(v) <= Config.MAX_LOCATIONS):
+            raise ValueError(
+                f"候補地点は1から{Config.MAX_LOCATIONS}の間で設定してください"
+            )
+        return v
+
+
+class EvaluateRequest(BaseModel):
+    depot: LatLng
+    locations: List[LatLng]
+    # Each tour lists indices into `locations` in visit order
+    tours: List[List[int]]
+
+    @validator("locations")
+    def check_locations(cls, v: List[LatLng]):
+        if not (1 <= len(v) <= Config.MAX_LOCATIONS):
+            raise ValueError(
+                f"訪問地点は1から{Config.MAX_LOCATIONS}の間で設定してください"
+            )
+        return v
+
+    @validator("tours")
+    def check_tours(cls, v: List[List[int]]):
+        if not (1 <= len(v) <= Config.MAX_EVAL_TOURS):
+            raise ValueError(
+                f"評価する巡回路は1から{Config.MAX_EVAL_TOURS}の間で設定してください"
+            )
+        for tour in v:
+            if len(set(tour)) != len(tour):
+                raise ValueError("巡回路に同じ地点が重複しています")
+        return v
+
+
 class OptimizeResponse(BaseModel):
     route: List[int]
     total_distance: int
     route_geometries: List[str]
 
+
+# Content type for the packed binary request body: little-endian float64
+# pairs ``lat, lng`` with the depot first, then each location.
+# A dedicated type: clients that label JSON as octet-stream keep working.
+PACKED_COORDS_MIMETYPE = "application/vnd.route-chan.latlng-f64"
+
+_NUMBER_TYPES = (int, float)
+
+
+def _column(values: Any) -> Optional[np.ndarray]:
+    # Only plain numbers take the fast path; anything pydantic would have to
+    # coerce (numeric strings, bools, ...) is left to the model.
+    if not isinstance(values, list):
+        return None
+    if not all(type(v) in _NUMBER_TYPES for v in values):
+        return None
+    return np.asarray(values, dtype=np.float64)
+
+
+def _payload_columns(payload: Any) -> Optional[np.ndarray]:
+    if not isinstance(payload, dict):
+        return None
+    depot, locs = payload.get("depot"), payload.get("locations")
+    if not isinstance(depot, dict):
+        return None
+    if isinstance(locs, dict):
+        # Columnar form: {"lat": [...], "lng": [...]}
+        lats, lngs = locs.get("lat"), locs.get("lng")
+    elif isinstance(locs, list) and all(isinstance(loc, dict) for loc in locs):
+        lats = [loc.get("lat") for loc in locs]
+        lngs = [loc.get("lng") for loc in locs]
+    else:
+        return None
+    lat = _column([depot.get("lat")] + lats) if isinstance(lats, list) else None
+    lng = _column([depot.get("lng")] + lngs) if isinstance(lngs, list) else None
+    if lat is None or lng is None or lat.shape != lng.shape:
+        return None
+    return np.column_stack((lat, lng))
+
+
+def _rows_payload(payload: Any) -> Any:
+    locs = payload.get("locations") if isinstance(payload, dict) else None
+    if not isinstance(locs, dict):
+        return payload
+    lats, lngs = locs.get("lat"), locs.get("lng")
+    if not (isinstance(lats, list) and isinstance(lngs, list)):
+        return payload
+    if len(lats) != len(lngs):
+        raise ValueError("locations の lat と lng の要素数が一致しません")
+    rows = [{"lat": a, "lng": b} for a, b in zip(lats, lngs)]
+    return {**payload, "locations": rows}
+
+
+def _validate_columns(
+    coords: Optional[np.ndarray], rows: Callable[[], Any]
+) -> List[Tuple[float, float]]:
+    if coords is not None and 2 <= len(coords) <= Config.MAX_LOCATIONS + 1:
+        lat, lng = coords[:, 0], coords[:, 1]
+        # NaN fails both comparisons and falls through to the model
+        ok = (lat >= -90) & (lat <= 90) & (lng >= -180) & (lng <= 180)
+        if ok.all():
+            return list(map(tuple, coords.tolist()))
+    # Slow path: the model either coerces the input or raises the usual error
+    req = OptimizeRequest(**rows())
+    return [(req.depot.lat, req.depot.lng)] + [
+        (loc.lat, loc.lng) for loc in req.locations
+    ]
+
+
+def validate_optimize_payload(payload: Any) -> List[Tuple[float, float]]:
+    """
+    Validate an /api/optimize JSON body and return ``[depot] + locations``
+    as ``(lat, lng)`` tuples.
+
+    Accepts ``locations`` either as a list of ``{lat, lng}`` objects or in
+    columnar form ``{"lat": [...], "lng": [...]}``. Ranges and counts are
+    checked on packed arrays in one pass; only invalid or unusual input is
+    handed to `OptimizeRequest`, so error messages are unchanged.
+    """
+    return _validate_columns(
+        _payload_columns(payload), lambda: _rows_payload(payload)
+    )
+
+
+def parse_optimize_options(source: Any) -> OptimizeOptions:
+    """Read per-request options from the JSON body or the query string."""
+    if not hasattr(source, "get"):
+        return OptimizeOptions()
+    fields = ("max_latency_ms", "priority")
+    return OptimizeOptions(**{k: source.get(k) for k in fields if source.get(k) is not None})
+
+
+def validate_packed_coords(body: bytes) -> List[Tuple[float, float]]:
+    """Validate a `PACKED_COORDS_MIMETYPE` body (see above)."""
+    if len(body) % 16 != 0:
+        raise ValueError("座標のバイナリ形式が不正です（float64 の lat/lng の組が必要です）")
+    coords = np.frombuffer(body, dtype="<f8").reshape(-1, 2)
+
+    def rows():
+        pairs = coords.tolist()
+        depot = {"lat": pairs[0][0], "lng": pairs[0][1]} if pairs else None
+        return {
+            "depot": depot,
+            "locations": [{"lat": a, "lng": b} for a, b in pairs[1:]],
+        }
+
+    return _validate_columns(coords, rows)
+
+
+def validate_insertion_payload(
+    payload: Any,
+) -> Tuple[List[Tuple[float, float]], int]:
+    """
+    Validate an /api/insertions body. Returns ``[depot] + route + candidates``
+    as ``(lat, lng)`` tuples and the number of route stops.
+    """
+    req = InsertionRequest(**payload)
+    coords = [(p.lat, p.lng) for p in [req.depot] + req.route + req.candidates]
+    return coords, len(req.route)
+
+
+def validate_evaluate_payload(
+    payload: Any,
+) -> Tuple[List[Tuple[float, float]], List[List[int]]]:
+    """Validate an /api/evaluate body. Returns ``[depot] + locations`` and the tours."""
+    req = EvaluateRequest(**payload)
+    n = len(req.locations)
+    for tour in req.tours:
+        if any(not (0 <= i < n) for i in tour):
+            raise ValueError(f"巡回路の地点番号は0から{n - 1}の間で指定してください")
+    coords = [(p.lat, p.lng) for p in [req.depot] + req.locations]
+    return coords, req.tours
@@ -0,0 +1,302 @@
+"""
+Precomputed OSRM matrices for recurring location sets.
+
+A snapshot stores the full distance/duration matrix for a named set of
+coordinates (depots plus regular customers) as ``.npy`` files that are
+memory-mapped at lookup time. When every coordinate of a request is in a
+snapshot, /api/optimize slices the submatrix from it instead of calling
+the OSRM table API.
+
+Layout of ``<SNAPSHOT_DIR>/<name>/``::
+
+    meta.json                 current version, build time, OSRM URL
+    coords-<version>.npy      (n, 2) lat/lng
+    distances-<version>.npy   (n, n)
+    durations-<version>.npy   (n, n)
+
+A rebuild writes a new version and then swaps ``meta.json`` atomically,
+so running servers pick it up within their reload interval.
+
+Usage (from the repository root)::
+
+    python -m server.snapshot build NAME COORDS_FILE   # CSV "lat,lng" or JSON
+    python -m server.snapshot refresh NAME             # re-fetch from OSRM
+    python -m server.snapshot list
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import Config
+from .matrix import DistanceMatrix
+from .osrm_client import OsrmError, get_table
+from .spatial import GridIndex
+
+
+# OSRM itself works with 6 decimal places (polyline6, ~0.1 m)
+COORD_PRECISION = 6
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def coord_key(lat: float, lng: float) -> Tuple[float, float]:
+    return (round(lat, COORD_PRECISION), round(lng, COORD_PRECISION))
+
+
+class Snapshot:
+    def __init__(self, path: Path, meta: dict):
+        version = meta["version"]
+        self.name = meta["name"]
+        self.meta = meta
+        self.coords = np.load(path / f"coords-{version}.npy")
+        self.distances = np.load(path / f"distances-{version}.npy", mmap_mode="r")
+        self.durations = np.load(path / f"durations-{version}.npy", mmap_mode="r")
+        self.index: Dict[Tuple[float, float], int] = {
+            coord_key(lat, lng): i for i, (lat, lng) in enumerate(self.coords.tolist())
+        }
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def resolve(self, coords: Sequence[Tuple[float, float]]) -> Optional[List[int]]:
+        """Snapshot row for each coordinate, or None if any is unknown."""
+        idx = []
+        for lat, lng in coords:
+            i = self.index.get(coord_key(lat, lng))
+            if i is None:
+                return None
+            idx.append(i)
+        return idx
+
+    def submatrix(self, idx: Sequence[int], kind: str = "distances") -> DistanceMatrix:
+        src = self.distances if kind == "distances" else self.durations
+        return DistanceMatrix(np.array(src[np.ix_(idx, idx)], dtype=np.float64))
+
+
+class SnapshotStore:
+    """
+    Lazily loads every snapshot under a directory and reloads on rebuild.
+
+    The directory is re-scanned at most once per ``reload_interval_s``, so a
+    rebuild becomes visible within that interval rather than every request
+    paying for a glob and a stat per snapshot. Safe to share between
+    request threads.
+    """
+
+    def __init__(self, root: str, reload_interval_s: float = 5.0):
+        self.root = Path(root)
+        self.reload_interval_s = reload_interval_s
+        self._loaded: Dict[str, Tuple[Tuple[int, int], Snapshot]] = {}
+        self._grid: Optional[Tuple[tuple, GridIndex]] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        # Caller holds self._lock
+        now = time.monotonic()
+        if (
+            self._checked_at is not None
+            and now - self._checked_at < self.reload_interval_s
+        ):
+            return
+        self._checked_at = now
+        seen = set()
+        for meta_path in self.root.glob("*/meta.json"):
+            name = meta_path.parent.name
+            seen.add(name)
+            try:
+                st = meta_path.stat()
+                # meta.json is swapped with os.replace, so the inode changes too
+                stamp = (st.st_mtime_ns, st.st_ino)
+                cached = self._loaded.get(name)
+                if cached is not None and cached[0] == stamp:
+                    continue
+                meta = json.loads(meta_path.read_text())
+                self._loaded[name] = (stamp, Snapshot(meta_path.parent, meta))
+            except (OSError, ValueError, KeyError):
+                # Half-written or removed snapshot: keep serving the old one
+                continue
+        for name in set(self._loaded) - seen:
+            del self._loaded[name]
+
+    def snapshots(self) -> List[Snapshot]:
+        with self._lock:
+            self._refresh()
+            return [snap for _, snap in self._loaded.values()]
+
+    def snap(
+        self, coords: Sequence[Tuple[float, float]], tolerance_m: float
+    ) -> List[Tuple[float, float]]:
+        """
+        Replace each coordinate with the nearest snapshot point within
+        ``tolerance_m``, so centimetre-level jitter still hits a snapshot.
+        """
+        if tolerance_m <= 0:
+            return list(coords)
+        snaps = self.snapshots()
+        key = (tolerance_m,) + tuple(sorted((s.name, s.meta["version"]) for s in snaps))
+        with self._lock:
+            if self._grid is None or self._grid[0] != key:
+                grid: GridIndex[None] = GridIndex(tolerance_m)
+                for snap in snaps:
+                    for lat, lng in snap.coords.tolist():
+                        grid.add(lat, lng, None)
+                self._grid = (key, grid)
+            grid = self._grid[1]
+        out = []
+        for lat, lng in coords:
+            hit = grid.nearest(lat, lng, tolerance_m)
+            out.append(hit[1] if hit is not None else (lat, lng))
+        return out
+
+    def lookup(self, coords: Sequence[Tuple[float, float]]) -> Optional[DistanceMatrix]:
+        """Distance submatrix for coords from the first snapshot covering them all."""
+        for snap in self.snapshots():
+            idx = snap.resolve(coords)
+            if idx is not None:
+                return snap.submatrix(idx)
+        return None
+
+
+def _check_name(name: str) -> str:
+    if not _NAME_RE.match(name):
+        raise ValueError(f"invalid snapshot name: {name!r}")
+    return name
+
+
+def load_coords_file(path: str) -> List[Tuple[float, float]]:
+    """Read coordinates from JSON (``[{lat, lng}]`` or ``[[lat, lng]]``) or CSV."""
+    text = Path(path).read_text(encoding="utf-8")
+    if path.endswith(".json"):
+        items = json.loads(text)
+        return [
+            (float(c["lat"]), float(c["lng"]))
+            if isinstance(c, dict)
+            else (float(c[0]), float(c[1]))
+            for c in items
+        ]
+    coords = []
+    for row in csv.reader(text.splitlines()):
+        if len(row) < 2:
+            continue
+        try:
+            coords.append((float(row[0]), float(row[1])))
+        except ValueError:
+            continue  # header line
+    return coords
+
+
+def build_snapshot(
+    root: str,
+    name: str,
+    coords: List[Tuple[float, float]],
+    base_url: Optional[str] = None,
+) -> dict:
+    """Fetch the full matrix for coords from OSRM and publish it as `name`."""
+    _check_name(name)
+    # Deduplicate so the coordinate index is unambiguous
+    unique = list({coord_key(lat, lng): (lat, lng) for lat, lng in coords}.values())
+    if not unique:
+        raise ValueError("no coordinates given")
+    base_url = base_url or Config.OSRM_BASE_URLS[0]
+
+    mats = get_table(
+        base_url,
+        unique,
+        (Config.TIMEOUT_CONNECT, Config.TIMEOUT_READ),
+        annotations=("distance", "duration"),
+        max_coords=Config.OSRM_TABLE_MAX_COORDS,
+    )
+
+    path = Path(root) / name
+    path.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    version = f"{stamp}-{time.time_ns() % 10**9:09d}"
+    np.save(path / f"coords-{version}.npy", np.asarray(unique, dtype=np.float64))
+    np.save(path / f"distances-{version}.npy", mats["distances"].values)
+    np.save(path / f"durations-{version}.npy", mats["durations"].values)
+
+    meta = {
+        "name": name,
+        "version": version,
+        "size": len(unique),
+        "osrm_base_url": base_url,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    meta_path = path / "meta.json"
+    previous = json.loads(meta_path.read_text())["version"] if meta_path.exists() else None
+    tmp = path / f".meta-{version}.json"
+    tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=2))
+    os.replace(tmp, meta_path)
+
+    if previous and previous != version:
+        # Readers that already mapped the old files keep them until closed
+        for kind in ("coords", "distances", "durations"):
+            (path / f"{kind}-{previous}.npy").unlink(missing_ok=True)
+    return meta
+
+
+def refresh_snapshot(root: str, name: str, base_url: Optional[str] = None) -> dict:
+    """Re-fetch an existing snapshot's matrix to pick up new OSRM data."""
+    path = Path(root) / _check_name(name)
+    meta = json.loads((path / "meta.json").read_text())
+    coords = np.load(path / f"coords-{meta['version']}.npy")
+    return build_snapshot(
+        root,
+        name,
+        [tuple(c) for c in coords.tolist()],
+        base_url=base_url or meta.get("osrm_base_url"),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m server.snapshot", description=__doc__.split("\n\n")[0].strip()
+    )
+    parser.add_argument(
+        "--dir", default=Config.SNAPSHOT_DIR, help="snapshot directory (SNAPSHOT_DIR)"
+    )
+    parser.add_argument("--osrm", default=None, help="OSRM base URL (OSRM_BASE_URL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="precompute a new location set")
+    p_build.add_argument("name")
+    p_build.add_argument("coords_file")
+    p_refresh = sub.add_parser("refresh", help="re-fetch an existing set from OSRM")
+    p_refresh.add_argument("name")
+    sub.add_parser("list", help="show stored sets")
+    args = parser.parse_args(argv)
+
+    if not args.dir:
+        parser.error("snapshot directory is not set (use --dir or SNAPSHOT_DIR)")
+
+    try:
+        if args.command == "build":
+            meta = build_snapshot(
+                args.dir, args.name, load_coords_file(args.coords_file), args.osrm
+            )
+        elif args.command == "refresh":
+            meta = refresh_snapshot(args.dir, args.name, args.osrm)
+        else:
+            for snap in SnapshotStore(args.dir).snapshots():
+                m = snap.meta
+                print(f"{m['name']}\t{m['size']}\t{m['built_at']}\t{m['osrm_base_url']}")
+            return 0
+    except (OsrmError, OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{meta['name']}: {meta['size']} locations, version {meta['version']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,71 @@
-from typing import List, Tuple
+import time
+from dataclasses import dataclass
+from typing import List, Optional
 
+import numpy as np
 from ortools.constraint_solver import pywrapcp, routing_enums_pb2
 
+from .matrix import MatrixLike, as_distance_matrix
+
+
+@dataclass
+class SolveStats:
+    n: int
+    time_limit_ms: int
+    wall_ms: float = 0.0
+    # Time at which the final (best) solution was found
+    time_to_best_ms: Optional[float] = None
+    solutions: int = 0
+    # k used for successor restriction, None when the full graph was searched
+    neighbors: Optional[int] = None
+
+
+def nearest_neighbors(costs: np.ndarray, k: int) -> np.ndarray:
+    """``(n, k)`` array of each node's k cheapest successors, excluding itself."""
+    n = len(costs)
+    k = min(k, n - 1)
+    masked = costs.astype(np.float64, copy=True)
+    np.fill_diagonal(masked, np.inf)
+    return np.argpartition(masked, k - 1, axis=1)[:, :k]
+
+
+def greedy_tour(costs: np.ndarray) -> List[int]:
+    """Nearest-neighbour tour from the depot, as nodes 1..n-1 in visit order."""
+    n = len(costs)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    big = np.iinfo(np.int64).max
+    order: List[int] = []
+    current = 0
+    for _ in range(n - 1):
+        current = int(np.where(visited, big, costs[current]).argmin())
+        visited[current] = True
+        order.append(current)
+    return order
+
+
+def _restrict_successors(
+    routing, manager, costs: np.ndarray, k: int, seed: List[int]
+) -> None:
+    n = len(costs)
+    knn = nearest_neighbors(costs, k)
+    # Symmetrise: j may follow i if either is among the other's k nearest.
+    allowed = np.zeros((n, n), dtype=bool)
+    allowed[np.repeat(np.arange(n), knn.shape[1]), knn.ravel()] = True
+    allowed |= allowed.T
+    # Keep the seed tour's arcs so at least one complete tour stays feasible
+    allowed[seed[:-1], seed[1:]] = True
+    end = routing.End(0)
+    for node in range(1, n):
+        nexts = [manager.NodeToIndex(int(j)) for j in np.flatnonzero(allowed[node]) if j]
+        # Returning to the depot is always allowed; the depot may go anywhere
+        routing.NextVar(manager.NodeToIndex(node)).SetValues(nexts + [end])
+
 
 def solve_tsp_distance_matrix(
-    distance_matrix: List[List[int]], time_limit_ms: int = 3000
+    distance_matrix: MatrixLike,
+    time_limit_ms: int = 3000,
+    neighbors: Optional[int] = None,
 ) -> tuple[List[int], int]:
     """
     Solve a single-vehicle TSP with a fixed depot at node 0.
@@ -13,21 +74,48 @@ def solve_tsp_distance_matrix(
     - route: visit order as indices into the `locations` array (0-based),
              i.e., OR-Tools nodes 1..N mapped to 0..N-1
     - total_distance: total travel cost along 0 -> route -> 0
+
+    `distance_matrix` may be a `DistanceMatrix` or nested lists.
+
+    With `neighbors=k`, each stop may only be followed by one of its k
+    nearest stops or the depot. The search starts from a nearest-neighbour
+    tour whose arcs are also kept, so the restricted model is always
+    feasible.
     """
+    route, total, _ = solve_tsp_with_stats(distance_matrix, time_limit_ms, neighbors)
+    return route, total
+
+
+def solve_tsp_with_stats(
+    distance_matrix: MatrixLike,
+    time_limit_ms: int = 3000,
+    neighbors: Optional[int] = None,
+) -> tuple[List[int], int, SolveStats]:
+    """Same as `solve_tsp_distance_matrix`, plus search statistics."""
     n = len(distance_matrix)
+    stats = SolveStats(n=n, time_limit_ms=int(time_limit_ms))
     if n == 0:
-        return [], 0
+        return [], 0, stats
+    # Restricting to k >= n - 1 neighbours would not remove any arc
+    restrict = bool(neighbors) and neighbors < n - 1
 
     manager = pywrapcp.RoutingIndexManager(n, 1, 0)
     routing = pywrapcp.RoutingModel(manager)
 
-    def distance_callback(from_index: int, to_index: int) -> int:
-        from_node = manager.IndexToNode(from_index)
-        to_node = manager.IndexToNode(to_index)
-        return int(distance_matrix[from_node][to_node])
-
-    transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    # Hand the whole matrix to OR-Tools so arcs are evaluated in C++
+    # rather than through a Python callback per arc. The SWIG binding only
+    # accepts nested Python lists (not arrays, tuples or lazy sequences), so
+    # n^2 int objects exist for the duration of this call: ~32 MB peak at
+    # 1,000 stops. They are dropped as soon as it returns; OR-Tools then
+    # keeps its own 8-byte-per-arc copy.
+    costs = as_distance_matrix(distance_matrix).to_costs()
+    transit_callback_index = routing.RegisterTransitMatrix(costs.tolist())
     routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+    seed: List[int] = []
+    if restrict:
+        seed = greedy_tour(costs)
+        _restrict_successors(routing, manager, costs, neighbors, seed)
+        stats.neighbors = int(neighbors)
 
     search_params = pywrapcp.DefaultRoutingSearchParameters()
     search_params.first_solution_strategy = (
@@ -38,9 +126,28 @@ def solve_tsp_distance_matrix(
     )
     search_params.time_limit.FromMilliseconds(int(time_limit_ms))
 
-    solution = routing.SolveWithParameters(search_params)
+    best = [None]
+    t0 = time.perf_counter()
+
+    def on_solution():
+        stats.solutions += 1
+        cost = routing.CostVar().Max()
+        if best[0] is None or cost < best[0]:
+            best[0] = cost
+            stats.time_to_best_ms = (time.perf_counter() - t0) * 1000
+
+    routing.AddAtSolutionCallback(on_solution)
+    if restrict:
+        routing.CloseModelWithParameters(search_params)
+        initial = routing.ReadAssignmentFromRoutes(
+            [[manager.NodeToIndex(node) for node in seed]], True
+        )
+        solution = routing.SolveFromAssignmentWithParameters(initial, search_params)
+    else:
+        solution = routing.SolveWithParameters(search_params)
+    stats.wall_ms = (time.perf_counter() - t0) * 1000
     if not solution:
-        return [], 0
+        return [], 0, stats
 
     # Extract route excluding depot. Map nodes 1..N -> locations indices 0..N-1
     index = routing.Start(0)
@@ -55,5 +162,5 @@ def solve_tsp_distance_matrix(
             order.append(to_node - 1)
         index = next_index
 
-    return order, int(route_distance)
+    return order, int(route_distance), stats
 
@@ -0,0 +1,100 @@
+import math
+from typing import Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def haversine_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lat1, lng1 = map(math.radians, a)
+    lat2, lng2 = map(math.radians, b)
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(h, 1.0)))
+
+
+class GridIndex(Generic[T]):
+    """
+    Uniform grid in degrees for radius queries.
+
+    Rows are ``cell_m`` metres of latitude. Each row gets its own longitude
+    step, wide enough that ``cell_m`` east-west at the most poleward
+    latitude the row (or a neighbouring row) reaches stays within one
+    column. A query within ``cell_m`` therefore only needs the three nearest
+    columns of its own and the two adjacent rows. Meant for metre-scale
+    snapping; it does not handle the antimeridian.
+    """
+
+    def __init__(self, cell_m: float):
+        self.cell_m = max(float(cell_m), 1e-3)
+        self._dlat = math.degrees(self.cell_m / EARTH_RADIUS_M)
+        self._cells: Dict[Tuple[int, int], List[Tuple[Tuple[float, float], T]]] = {}
+
+    def _row(self, lat: float) -> int:
+        return math.floor(lat / self._dlat)
+
+    def _lng_step(self, row: int) -> float:
+        # Poleward edge of the row plus one row of margin for the neighbour
+        edge = max(abs(row), abs(row + 1)) * self._dlat + self._dlat
+        return self._dlat / max(math.cos(math.radians(min(edge, 90.0))), 1e-6)
+
+    def _col(self, row: int, lng: float) -> int:
+        return math.floor(lng / self._lng_step(row))
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._cells.values())
+
+    def add(self, lat: float, lng: float, value: T) -> None:
+        row = self._row(lat)
+        key = (row, self._col(row, lng))
+        self._cells.setdefault(key, []).append(((lat, lng), value))
+
+    def nearest(
+        self, lat: float, lng: float, max_m: Optional[float] = None
+    ) -> Optional[Tuple[float, Tuple[float, float], T]]:
+        """Closest ``(distance_m, point, value)`` within ``max_m`` (<= cell size)."""
+        max_m = self.cell_m if max_m is None else min(max_m, self.cell_m)
+        best = None
+        qrow = self._row(lat)
+        for row in (qrow - 1, qrow, qrow + 1):
+            col = self._col(row, lng)
+            for c in (col - 1, col, col + 1):
+                for point, value in self._cells.get((row, c), ()):
+                    d = haversine_m((lat, lng), point)
+                    if d <= max_m and (best is None or d < best[0]):
+                        best = (d, point, value)
+        return best
+
+
+def merge_colocated(
+    points: Sequence[Tuple[float, float]], tolerance_m: float
+) -> Tuple[List[Tuple[float, float]], List[List[int]]]:
+    """
+    Collapse points that lie within ``tolerance_m`` of an earlier point.
+
+    Returns the representative points (first occurrence of each group, in
+    input order) and, for each representative, the input indices it stands
+    for. With ``tolerance_m <= 0`` every point is its own group.
+    """
+    if tolerance_m <= 0:
+        return list(points), [[i] for i in range(len(points))]
+    index: GridIndex[int] = GridIndex(tolerance_m)
+    reps: List[Tuple[float, float]] = []
+    members: List[List[int]] = []
+    for i, (lat, lng) in enumerate(points):
+        hit = index.nearest(lat, lng, tolerance_m)
+        if hit is not None:
+            members[hit[2]].append(i)
+            continue
+        index.add(lat, lng, len(reps))
+        reps.append((lat, lng))
+        members.append([i])
+    return reps, members
+
+
+def expand_route(route: Sequence[int], members: Sequence[Sequence[int]]) -> List[int]:
+    """Map a route over merged points back to original indices (groups stay adjacent)."""
+    return [i for r in route for i in members[r]]
@@ -0,0 +1,72 @@
+import importlib
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SolverWarmup:
+    """
+    Imports OR-Tools and runs a tiny solve off the request path.
+
+    ``server.solver`` pulls in OR-Tools and protobuf, which dominates cold
+    start. The app no longer imports it at module load; instead this runs in
+    a background thread and readiness is reported only once a dummy solve
+    has succeeded. Timings are kept for the startup report.
+    """
+
+    def __init__(self, origin: Optional[float] = None):
+        # perf_counter() value the startup timings are measured from
+        self.origin = time.perf_counter() if origin is None else origin
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.timings_ms: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> None:
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.state = "warming"
+        threading.Thread(target=self._run, name="solver-warmup", daemon=True).start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self) -> None:
+        try:
+            t0 = time.perf_counter()
+            solver = importlib.import_module(".solver", __package__)
+            t1 = time.perf_counter()
+            route, _ = solver.solve_tsp_distance_matrix(
+                [[0, 1, 2], [1, 0, 1], [2, 1, 0]], time_limit_ms=10
+            )
+            if sorted(route) != [0, 1]:
+                raise RuntimeError(f"warmup solve returned {route!r}")
+            t2 = time.perf_counter()
+            self.timings_ms = {
+                "solver_import_ms": round((t1 - t0) * 1000, 1),
+                "warmup_solve_ms": round((t2 - t1) * 1000, 1),
+                "ready_ms": round((t2 - self.origin) * 1000, 1),
+            }
+            self.state = "ready"
+            logger.info("solver ready: %s", self.timings_ms)
+        except Exception as e:  # pragma: no cover - depends on the install
+            self.state = "failed"
+            self.error = str(e)
+            logger.exception("solver warmup failed")
+        finally:
+            self._done.set()
+
+    def report(self) -> dict:
+        out = {"state": self.state, **self.timings_ms}
+        if self.error:
+            out["error"] = self.error
+        return out
@@ -121,6 +121,37 @@ def test_optimize_validation_error_returns_400(app_client):
     assert resp.get_json().get("error") == "VALIDATION_ERROR"
 
 
+def test_optimize_overloaded_returns_503_with_retry_after(app_client, monkeypatch):
+    import server.app as app_mod
+    from server.scheduler import Overloaded
+
+    def shed(priority):
+        raise Overloaded(2.4)
+
+    monkeypatch.setattr(app_mod.scheduler, "check_admission", shed)
+    resp = app_client.post("/api/optimize", json=_payload(1))
+    assert resp.status_code == 503
+    assert resp.get_json().get("error") == "OVERLOADED"
+    assert resp.headers["Retry-After"] == "3"
+
+
+def test_optimize_invalid_priority_returns_400(app_client):
+    payload = _payload(1)
+    payload["priority"] = "urgent"
+    resp = app_client.post("/api/optimize", json=payload)
+    assert resp.status_code == 400
+    assert resp.get_json().get("error") == "VALIDATION_ERROR"
+
+
+def test_optimize_invalid_max_latency_returns_400(app_client):
+    client = app_client
+    payload = _payload(1)
+    payload["max_latency_ms"] = 0
+    resp = client.post("/api/optimize", json=payload)
+    assert resp.status_code == 400
+    assert resp.get_json().get("error") == "VALIDATION_ERROR"
+
+
 @responses.activate
 def test_optimize_osrm_table_failure_returns_502(app_client):
     import server.osrm_client as oc
@@ -294,3 +325,310 @@ def test_optimize_eleven_locations_returns_400(app_client):
     assert resp.status_code == 400
     # MAX_LOCATIONS を超えると Pydantic のバリデーションエラーになる想定
     assert resp.get_json().get("error") == "VALIDATION_ERROR"
+
+
+@responses.activate
+@pytest.mark.parametrize("body_format", ["columnar", "packed", "octet_json"])
+def test_optimize_compact_input_formats(app_client, body_format):
+    import struct
+
+    import server.osrm_client as oc
+
+    client = app_client
+    base_url = "https://osrm.test"
+    payload = _payload(2)
+    coords = [(payload["depot"]["lat"], payload["depot"]["lng"])] + [
+        (loc["lat"], loc["lng"]) for loc in payload["locations"]
+    ]
+    table_url = f"{base_url}/table/v1/driving/{oc._coords_to_path(coords)}?annotations=distance"
+    dm = [[0, 100, 300], [120, 0, 200], [280, 220, 0]]
+    responses.add(responses.GET, table_url, json={"distances": dm}, status=200)
+    route_re = re.compile(r"^https://osrm\.test/route/v1/driving/.+\?overview=full&geometries=polyline6$")
+    responses.add(
+        responses.GET,
+        route_re,
+        json={"routes": [{"legs": [{"geometry": "g0"}, {"geometry": "g1"}, {"geometry": "g2"}]}]},
+        status=200,
+    )
+
+    if body_format == "columnar":
+        body = {
+            "depot": payload["depot"],
+            "locations": {
+                "lat": [loc["lat"] for loc in payload["locations"]],
+                "lng": [loc["lng"] for loc in payload["locations"]],
+            },
+        }
+        resp = client.post("/api/optimize", json=body)
+    elif body_format == "octet_json":
+        # 既存クライアント: octet-stream と宣言した JSON も従来どおり受け付ける
+        resp = client.post(
+            "/api/optimize",
+            data=json.dumps(payload),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+    else:
+        packed = struct.pack(f"<{2 * len(coords)}d", *[v for c in coords for v in c])
+        resp = client.post(
+            "/api/optimize",
+            data=packed,
+            headers={"Content-Type": "application/vnd.route-chan.latlng-f64"},
+        )
+
+    assert resp.status_code == 200
+    data = resp.get_json()
+    tour_nodes = [0] + [r + 1 for r in data["route"]] + [0]
+    assert data["total_distance"] == _tour_cost(dm, tour_nodes)
+    assert data["route_geometries"] == ["g0", "g1", "g2"]
+
+
+@responses.activate
+def test_optimize_uses_snapshot_without_table_call(monkeypatch, tmp_path):
+    import numpy as np
+
+    # 事前計算済みスナップショットを直接書き出す
+    snap_dir = tmp_path / "depot-a"
+    snap_dir.mkdir()
+    coords = [(35.0, 135.0), (35.01, 135.01), (35.02, 135.02)]
+    np.save(snap_dir / "coords-v1.npy", np.array(coords))
+    dm = np.array([[0, 100, 300], [120, 0, 200], [280, 220, 0]], dtype=float)
+    np.save(snap_dir / "distances-v1.npy", dm)
+    np.save(snap_dir / "durations-v1.npy", dm / 10)
+    (snap_dir / "meta.json").write_text(
+        json.dumps({"name": "depot-a", "version": "v1", "size": 3})
+    )
+
+    monkeypatch.setenv("OSRM_BASE_URL", "https://osrm.test")
+    monkeypatch.setenv("RATE_LIMIT_RULE", "100/second")
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path))
+    _reload_module("server.config")
+    app = _reload_module("server.app").app
+    app.testing = True
+    client = app.test_client()
+
+    route_re = re.compile(r"^https://osrm\.test/route/v1/driving/.+\?overview=full&geometries=polyline6$")
+    responses.add(
+        responses.GET,
+        route_re,
+        json={"routes": [{"legs": [{"geometry": "g0"}, {"geometry": "g1"}, {"geometry": "g2"}]}]},
+        status=200,
+    )
+
+    payload = {
+        "depot": {"lat": 35.0, "lng": 135.0},
+        "locations": [{"lat": 35.01, "lng": 135.01}, {"lat": 35.02, "lng": 135.02}],
+    }
+    resp = client.post("/api/optimize", json=payload)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    tour_nodes = [0] + [r + 1 for r in data["route"]] + [0]
+    assert data["total_distance"] == _tour_cost(dm.tolist(), tour_nodes)
+    # table API は呼ばれず route API の 1 回だけ
+    assert len(responses.calls) == 1
+    assert "/route/v1/" in responses.calls[0].request.url
+
+
+@responses.activate
+def test_optimize_merges_colocated_stops(app_client):
+    import server.osrm_client as oc
+
+    client = app_client
+    base_url = "https://osrm.test"
+    depot = {"lat": 35.0, "lng": 135.0}
+    a = {"lat": 35.01, "lng": 135.01}
+    a_jitter = {"lat": 35.0100001, "lng": 135.0100001}  # 約 1.5cm ずれた同一地点
+    b = {"lat": 35.02, "lng": 135.02}
+    payload = {"depot": depot, "locations": [a, b, a_jitter]}
+
+    # table API には統合後の 3 地点だけが送られる
+    merged = [(depot["lat"], depot["lng"]), (a["lat"], a["lng"]), (b["lat"], b["lng"])]
+    table_url = f"{base_url}/table/v1/driving/{oc._coords_to_path(merged)}?annotations=distance"
+    dm = [[0, 100, 300], [120, 0, 200], [280, 220, 0]]
+    responses.add(responses.GET, table_url, json={"distances": dm}, status=200)
+    route_re = re.compile(r"^https://osrm\.test/route/v1/driving/.+\?overview=full&geometries=polyline6$")
+    legs = [{"geometry": f"g{i}"} for i in range(4)]
+    responses.add(responses.GET, route_re, json={"routes": [{"legs": legs}]}, status=200)
+
+    resp = client.post("/api/optimize", json=payload)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    # 応答は元の 3 地点すべてを含み、同一地点は連続する
+    assert sorted(data["route"]) == [0, 1, 2]
+    pos = {loc: i for i, loc in enumerate(data["route"])}
+    assert abs(pos[0] - pos[2]) == 1
+    assert len(data["route_geometries"]) == 4
+
+
+@responses.activate
+def test_optimize_profiling_with_token(monkeypatch, tmp_path):
+    import pstats
+
+    import server.osrm_client as oc
+
+    monkeypatch.setenv("OSRM_BASE_URL", "https://osrm.test")
+    monkeypatch.setenv("RATE_LIMIT_RULE", "100/second")
+    monkeypatch.setenv("PROFILE_TOKEN", "s3cret")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    _reload_module("server.config")
+    app = _reload_module("server.app").app
+    app.testing = True
+    client = app.test_client()
+
+    payload = _payload(1)
+    coords = [(payload["depot"]["lat"], payload["depot"]["lng"])] + [
+        (loc["lat"], loc["lng"]) for loc in payload["locations"]
+    ]
+    table_url = f"https://osrm.test/table/v1/driving/{oc._coords_to_path(coords)}?annotations=distance"
+    responses.add(responses.GET, table_url, json={"distances": [[0, 7], [3, 0]]}, status=200)
+    route_re = re.compile(r"^https://osrm\.test/route/v1/driving/.+\?overview=full&geometries=polyline6$")
+    responses.add(
+        responses.GET,
+        route_re,
+        json={"routes": [{"legs": [{"geometry": "g0"}, {"geometry": "g1"}]}]},
+        status=200,
+    )
+
+    # トークンなしではプロファイルされない
+    resp = client.post("/api/optimize", json=payload)
+    assert resp.status_code == 200
+    assert "X-Profile-Id" not in resp.headers
+
+    resp = client.post("/api/optimize", json=payload, headers={"X-Profile-Token": "s3cret"})
+    assert resp.status_code == 200
+    pid = resp.headers["X-Profile-Id"]
+
+    listed = client.get("/api/profiles", headers={"X-Profile-Token": "s3cret"}).get_json()
+    record = listed["profiles"][0]
+    assert record["id"] == pid
+    assert record["status"] == 200
+    assert len(record["fingerprint"]) == 16
+    assert record["solver"]["n"] == 2
+
+    dump = client.get(f"/api/profiles/{pid}", headers={"X-Profile-Token": "s3cret"})
+    assert dump.status_code == 200
+    prof_path = tmp_path / "downloaded.prof"
+    prof_path.write_bytes(dump.data)
+    stats = pstats.Stats(str(prof_path))
+    assert any("solve_tsp_with_stats" in func[2] for func in stats.stats)
+
+    # 誤ったトークンではダウンロードできない
+    assert client.get(f"/api/profiles/{pid}", headers={"X-Profile-Token": "x"}).status_code == 404
+
+    # プロファイルの保存に失敗しても最適化自体は成功する
+    import server.app as app_mod
+
+    def broken_save(prof, record):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(app_mod.profiles, "save", broken_save)
+    resp = client.post("/api/optimize", json=payload, headers={"X-Profile-Token": "s3cret"})
+    assert resp.status_code == 200
+    assert "X-Profile-Id" not in resp.headers
+
+
+def test_health_live_and_ready(monkeypatch):
+    # ウォームアップを無効にすると、最初の readiness プローブで開始される
+    monkeypatch.setenv("SOLVER_WARMUP", "0")
+    _reload_module("server.config")
+    app_mod = _reload_module("server.app")
+    client = app_mod.app.test_client()
+
+    assert client.get("/api/health").get_json() == {"status": "ok"}
+    assert client.get("/api/health/live").status_code == 200
+    assert app_mod.warmup.state == "pending"
+
+    first = client.get("/api/health/ready")
+    assert first.status_code in (200, 503)
+    assert app_mod.warmup.wait(30)
+
+    res = client.get("/api/health/ready")
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["status"] == "ready"
+    assert body["startup"]["state"] == "ready"
+    assert "app_import_ms" in body["startup"]
+    assert "warmup_solve_ms" in body["startup"]
+
+
+def test_first_solve_starts_deferred_warmup(monkeypatch):
+    monkeypatch.setenv("SOLVER_WARMUP", "0")
+    _reload_module("server.config")
+    app_mod = _reload_module("server.app")
+    monkeypatch.setattr(
+        app_mod, "get_distance_matrix", lambda *a, **k: [[0, 10], [10, 0]]
+    )
+    monkeypatch.setattr(app_mod, "get_route_geometries", lambda *a, **k: ["p0", "p1"])
+    client = app_mod.app.test_client()
+    assert app_mod.warmup.state == "pending"
+
+    # プローブが来る前でも、最初の求解でウォームアップが始まる
+    resp = client.post("/api/optimize", json=_payload(1))
+    assert resp.status_code == 200
+    assert app_mod.warmup.state != "pending"
+    assert app_mod.warmup.wait(30)
+    assert client.get("/api/health/ready").status_code == 200
+
+
+@responses.activate
+def test_insertions_returns_cheapest_positions(app_client):
+    import server.osrm_client as oc
+
+    payload = {
+        "depot": {"lat": 35.0, "lng": 135.0},
+        "route": [{"lat": 35.01, "lng": 135.01}, {"lat": 35.02, "lng": 135.02}],
+        "candidates": [{"lat": 35.03, "lng": 135.03}],
+    }
+    coords = [(35.0, 135.0), (35.01, 135.01), (35.02, 135.02), (35.03, 135.03)]
+    table_url = (
+        f"https://osrm.test/table/v1/driving/{oc._coords_to_path(coords)}"
+        "?annotations=distance"
+    )
+    # 候補地点（3）は地点 2 の直後が最も安い
+    dm = [
+        [0, 10, 20, 30],
+        [10, 0, 10, 40],
+        [20, 10, 0, 10],
+        [30, 20, 10, 0],
+    ]
+    responses.add(responses.GET, table_url, json={"distances": dm}, status=200)
+
+    resp = app_client.post("/api/insertions", json=payload)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["base_distance"] == 40
+    assert data["insertions"] == [{"position": 2, "delta": 20}]
+
+
+@responses.activate
+def test_evaluate_scores_tours(app_client):
+    import server.osrm_client as oc
+
+    payload = _payload(2)
+    payload["tours"] = [[0, 1], [1, 0], [1]]
+    coords = [(35.0, 135.0), (35.0, 135.0), (35.01, 135.01)]
+    table_url = (
+        f"https://osrm.test/table/v1/driving/{oc._coords_to_path(coords)}"
+        "?annotations=distance"
+    )
+    dm = [
+        [0, 100, 300],
+        [120, 0, 200],
+        [280, 220, 0],
+    ]
+    responses.add(responses.GET, table_url, json={"distances": dm}, status=200)
+
+    resp = app_client.post("/api/evaluate", json=payload)
+    assert resp.status_code == 200
+    assert resp.get_json()["distances"] == [
+        _tour_cost(dm, [0, 1, 2, 0]),
+        _tour_cost(dm, [0, 2, 1, 0]),
+        _tour_cost(dm, [0, 2, 0]),
+    ]
+
+
+def test_evaluate_rejects_out_of_range_index(app_client):
+    payload = _payload(2)
+    payload["tours"] = [[0, 2]]
+    resp = app_client.post("/api/evaluate", json=payload)
+    assert resp.status_code == 400
+    assert resp.get_json().get("error") == "VALIDATION_ERROR"
@@ -0,0 +1,72 @@
+import importlib
+import sys
+from pathlib import Path
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_budget():
+    return importlib.import_module("server.budget")
+
+
+def test_prior_scales_with_size_and_is_capped():
+    budget = _import_budget()
+    policy = budget.TimeBudgetPolicy(max_ms=3000, min_ms=100, slo_ms=10_000)
+
+    small = policy.time_limit_ms(4)
+    large = policy.time_limit_ms(11)
+    assert 100 <= small < large <= 3000
+    assert policy.time_limit_ms(1000) == 3000
+
+
+def test_learned_budget_uses_time_to_best():
+    budget = _import_budget()
+    policy = budget.TimeBudgetPolicy(max_ms=3000, min_ms=10, slo_ms=10_000, min_samples=5)
+    for _ in range(10):
+        policy.record_solve(11, 40.0)
+
+    # p95(40ms) × headroom(2) = 80ms
+    assert policy.time_limit_ms(11) == 80
+    # 別のサイズ帯は影響を受けない
+    assert policy.time_limit_ms(40) == int(policy.prior_ms(40))
+
+
+def test_solves_cut_short_are_not_learned():
+    budget = _import_budget()
+    policy = budget.TimeBudgetPolicy(max_ms=3000, min_ms=10, slo_ms=10_000, min_samples=5)
+    n = 11
+    learned = policy.learned_ms(n)  # 事前値 650ms
+
+    # SLO や混雑で制限が学習値より短かった求解は打ち切られており、記録しない
+    for _ in range(10):
+        policy.record_solve(n, 40.0, limit_ms=200, learned_ms=learned)
+    assert policy.time_limit_ms(n) == int(policy.prior_ms(n))
+
+    # 学習値どおりの制限で求解した結果は記録する
+    for _ in range(10):
+        policy.record_solve(n, 40.0, limit_ms=policy.time_limit_ms(n), learned_ms=learned)
+    assert policy.time_limit_ms(n) == 80
+
+    # 上限 max_ms による制限は恒常的なので打ち切り扱いしない
+    big = 200
+    for _ in range(10):
+        policy.record_solve(big, 500.0, limit_ms=3000, learned_ms=policy.learned_ms(big))
+    assert policy.time_limit_ms(big) == 1000
+
+
+def test_osrm_time_and_client_latency_shrink_budget():
+    budget = _import_budget()
+    policy = budget.TimeBudgetPolicy(max_ms=3000, min_ms=100, slo_ms=5000)
+    policy.record_route_call(300.0)
+
+    # 200 件規模の事前値 (10100ms) は上限で 3000ms に制限される
+    assert policy.time_limit_ms(200) == 3000
+    # OSRM で 2500ms 使った後は 5000 - 2500 - 300 = 2200ms
+    assert policy.time_limit_ms(200, elapsed_ms=2500) == 2200
+    # クライアントの max_latency_ms が優先される
+    assert policy.time_limit_ms(200, elapsed_ms=100, max_latency_ms=1000) == 600
+    # 残りがなくても最低限の時間は確保する
+    assert policy.time_limit_ms(200, elapsed_ms=6000) == 100
@@ -98,3 +98,73 @@ def test_optimize_request_locations_count_limits(monkeypatch):
     # 4 件のロケーションは MAX_LOCATIONS 超過で無効
     with pytest.raises(ValidationError):
         schemas.OptimizeRequest(depot=depot, locations=loc(4))
+
+
+def test_validate_optimize_payload_row_and_columnar_forms(monkeypatch):
+    _reload_config(monkeypatch, env={"MAX_LOCATIONS": "3"})
+    schemas = _reload_module("server.schemas")
+
+    depot = {"lat": 35.0, "lng": 135}
+    rows = {"depot": depot, "locations": [{"lat": 35.1, "lng": 135.1}, {"lat": -90, "lng": 180}]}
+    cols = {"depot": depot, "locations": {"lat": [35.1, -90], "lng": [135.1, 180]}}
+
+    expected = [(35.0, 135.0), (35.1, 135.1), (-90.0, 180.0)]
+    assert schemas.validate_optimize_payload(rows) == expected
+    assert schemas.validate_optimize_payload(cols) == expected
+
+    # pydantic が変換できる入力（数値文字列）は低速経路で受け付ける
+    rows_str = {"depot": {"lat": "35.0", "lng": "135"}, "locations": rows["locations"]}
+    assert schemas.validate_optimize_payload(rows_str) == expected
+
+
+def _model_error(schemas, payload):
+    try:
+        schemas.OptimizeRequest(**payload)
+    except ValidationError as e:
+        return e
+    raise AssertionError("expected ValidationError")
+
+
+def test_validate_optimize_payload_same_errors_as_model(monkeypatch):
+    _reload_config(monkeypatch, env={"MAX_LOCATIONS": "3"})
+    schemas = _reload_module("server.schemas")
+
+    bad = [
+        {"depot": {"lat": 90.5, "lng": 0}, "locations": [{"lat": 0, "lng": 0}]},
+        {"depot": {"lat": 0, "lng": 0}, "locations": [{"lat": 0, "lng": -181}]},
+        {"depot": {"lat": 0, "lng": 0}, "locations": []},
+        {"depot": {"lat": 0, "lng": 0}, "locations": [{"lat": 0, "lng": 0}] * 4},
+        {"locations": [{"lat": 0, "lng": 0}]},
+    ]
+    for payload in bad:
+        with pytest.raises(ValidationError) as fast:
+            schemas.validate_optimize_payload(payload)
+        with pytest.raises(ValidationError) as model:
+            schemas.OptimizeRequest(**payload)
+        assert str(fast.value) == str(model.value)
+
+    # 列形式でも行形式と同じエラーメッセージになる
+    cols = {"depot": {"lat": 0, "lng": 0}, "locations": {"lat": [0], "lng": [-181]}}
+    with pytest.raises(ValidationError) as fast:
+        schemas.validate_optimize_payload(cols)
+    assert str(fast.value) == str(_model_error(schemas, bad[1]))
+
+    with pytest.raises(ValueError):
+        schemas.validate_optimize_payload(
+            {"depot": {"lat": 0, "lng": 0}, "locations": {"lat": [0, 1], "lng": [0]}}
+        )
+
+
+def test_validate_packed_coords(monkeypatch):
+    import struct
+
+    _reload_config(monkeypatch)
+    schemas = _reload_module("server.schemas")
+
+    body = struct.pack("<4d", 35.0, 135.0, 35.1, 135.1)
+    assert schemas.validate_packed_coords(body) == [(35.0, 135.0), (35.1, 135.1)]
+
+    with pytest.raises(ValidationError):
+        schemas.validate_packed_coords(struct.pack("<4d", 35.0, 135.0, 91.0, 135.1))
+    with pytest.raises(ValueError):
+        schemas.validate_packed_coords(b"\x00" * 24)
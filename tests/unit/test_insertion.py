@@ -0,0 +1,66 @@
+import importlib
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_insertion():
+    return importlib.import_module("server.insertion")
+
+
+def _tour_cost(dm, tour):
+    # tour はデポ（0）を含まない訪問順
+    nodes = [0] + list(tour) + [0]
+    return sum(int(dm[a][b]) for a, b in zip(nodes, nodes[1:]))
+
+
+def _random_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # 非対称な行列でも成り立つことを確認する
+    return rng.integers(1, 1000, size=(n, n)).astype(float).tolist()
+
+
+def test_tour_costs_matches_loop_for_ragged_tours():
+    ins = _import_insertion()
+    dm = _random_matrix(8)
+    tours = [[1, 2, 3], [3, 2, 1], [7], [], [4, 5, 6, 7, 1], [2, 4, 6]]
+
+    assert ins.tour_costs(dm, tours) == [_tour_cost(dm, t) for t in tours]
+
+
+def test_cheapest_insertions_matches_brute_force():
+    ins = _import_insertion()
+    dm = _random_matrix(12, seed=3)
+    tour = [1, 2, 3, 4, 5, 6]
+    candidates = [7, 8, 9, 10, 11]
+
+    positions, deltas = ins.cheapest_insertions(dm, tour, candidates)
+
+    base = _tour_cost(dm, tour)
+    for c, pos, delta in zip(candidates, positions, deltas):
+        costs = [
+            _tour_cost(dm, tour[:p] + [c] + tour[p:]) - base
+            for p in range(len(tour) + 1)
+        ]
+        assert delta == min(costs)
+        # 同点の場合は先頭に近い位置を返す
+        assert pos == costs.index(min(costs))
+
+
+def test_cheapest_insertions_into_empty_tour():
+    ins = _import_insertion()
+    dm = [
+        [0, 10, 20],
+        [15, 0, 5],
+        [30, 5, 0],
+    ]
+    positions, deltas = ins.cheapest_insertions(dm, [], [1, 2])
+    assert positions == [0, 0]
+    assert deltas == [25, 50]
+    assert ins.cheapest_insertions(dm, [1], []) == ([], [])
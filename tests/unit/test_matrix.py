@@ -0,0 +1,75 @@
+import importlib
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_matrix():
+    return importlib.import_module("server.matrix")
+
+
+def test_from_rows_roundtrip_and_costs():
+    matrix = _import_matrix()
+    dm = matrix.DistanceMatrix.from_rows([[0, 10.7], [3.2, 0]])
+
+    assert len(dm) == 2
+    assert dm[0][1] == 10.7
+    assert dm.tolist() == [[0.0, 10.7], [3.2, 0.0]]
+    # int() と同じく 0 方向へ切り捨てる
+    assert dm.to_costs().tolist() == [[0, 10], [3, 0]]
+
+
+def test_from_rows_rejects_non_square():
+    matrix = _import_matrix()
+    with pytest.raises(ValueError):
+        matrix.DistanceMatrix.from_rows([[0, 1, 2], [1, 0, 2]])
+
+
+def test_missing_entries_are_rejected_as_costs():
+    matrix = _import_matrix()
+    insertion = importlib.import_module("server.insertion")
+    rows = [[0, None, 5], [1, 0, 2], [3, 4, 0]]
+    dm = matrix.DistanceMatrix.from_rows(rows)
+
+    # OSRM の「経路なし」(None) は NaN として保持し、整数コストには変換しない
+    assert dm.has_missing()
+    with pytest.raises(ValueError):
+        dm.to_costs()
+    with pytest.raises(ValueError):
+        insertion.tour_costs(rows, [[0, 1]])
+
+
+def test_packed_size_is_eight_bytes_per_cell():
+    matrix = _import_matrix()
+    dm = matrix.DistanceMatrix.empty(1000)
+    assert dm.nbytes == 1000 * 1000 * 8
+
+
+def test_shared_matrix_pickles_by_name():
+    matrix = _import_matrix()
+    dm = matrix.DistanceMatrix.from_rows([[0, 5], [7, 0]], shared=True)
+    try:
+        payload = pickle.dumps(dm)
+        # 行列の中身ではなく共有メモリ名だけがシリアライズされる
+        assert len(payload) < 200
+
+        other = pickle.loads(payload)
+        try:
+            assert other.shm_name == dm.shm_name
+            assert other.tolist() == [[0, 5], [7, 0]]
+
+            # 同じバッファを参照しているので書き込みが相互に見える
+            dm.values[0, 1] = 42
+            assert other[0][1] == 42
+        finally:
+            other.close()
+    finally:
+        dm.close()
+        dm.unlink()
@@ -0,0 +1,187 @@
+import importlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_backends():
+    return importlib.import_module("server.osrm_backends")
+
+
+class StandInOsrm:
+    """遅延やエラーを注入できるローカルの OSRM 代替サーバー。"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.delay_s = 0.0
+        self.status = 200
+        self.hits = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.hits += 1
+                time.sleep(stand_in.delay_s)
+                body = json.dumps({"code": "Ok", "backend": stand_in.name}).encode()
+                self.send_response(stand_in.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture()
+def stand_ins():
+    servers = [StandInOsrm("a"), StandInOsrm("b")]
+    yield servers
+    for s in servers:
+        s.close()
+
+
+def _dead_url():
+    # 接続を受け付けないポート
+    s = StandInOsrm("dead")
+    url = s.url
+    s.close()
+    return url
+
+
+def test_hedged_request_returns_fast_backend(stand_ins):
+    ob = _import_backends()
+    slow, fast = stand_ins
+    slow.delay_s = 1.0
+    pool = ob.OsrmBackends([slow.url, fast.url], hedge_initial_ms=50)
+    # 遅いバックエンドが必ず最初に選ばれるようにする
+    pool.choose = lambda exclude=(): next(
+        (b for b in pool.backends if b not in exclude), None
+    )
+
+    t0 = time.perf_counter()
+    resp = pool.get("/table/v1/driving/x", (1.0, 2.0))
+    elapsed = time.perf_counter() - t0
+
+    assert resp.json()["backend"] == "b"
+    assert elapsed < 0.8
+    assert slow.hits == 1 and fast.hits == 1
+
+
+def test_failover_on_dead_backend_and_5xx(stand_ins):
+    ob = _import_backends()
+    bad, good = stand_ins
+    bad.status = 503
+    pool = ob.OsrmBackends(
+        [_dead_url(), bad.url, good.url], hedge_percentile=None, failure_threshold=1
+    )
+    dead, five_xx, ok = pool.backends
+    choose = pool.choose
+    # 接続不可 -> 503 -> 正常の順に試すよう選択順を固定する
+    pool.choose = lambda exclude=(): next(
+        (b for b in pool.backends if b not in exclude and b.healthy(time.monotonic())),
+        None,
+    )
+
+    resp = pool.get("/route/v1/driving/x", (1.0, 2.0))
+    assert resp.json()["backend"] == "b"
+    assert bad.hits == 1
+
+    # 失敗したバックエンドはクールダウン中になる
+    now = time.monotonic()
+    assert dead.failures == 1 and dead.down_until > now
+    assert five_xx.failures == 1 and five_xx.down_until > now
+    assert ok.failures == 0 and ok.down_until == 0.0
+    assert not dead.healthy(now) and not five_xx.healthy(now)
+
+    # 本来の選択でもクールダウン中のバックエンドは選ばれない
+    pool.choose = choose
+    for _ in range(5):
+        assert pool.choose() is ok
+        resp = pool.get("/route/v1/driving/x", (1.0, 2.0))
+        assert resp.json()["backend"] == "b"
+    assert bad.hits == 1
+
+
+def test_pool_serves_many_concurrent_calls(stand_ins):
+    ob = _import_backends()
+    for s in stand_ins:
+        s.delay_s = 0.2
+    pool = ob.OsrmBackends(
+        [s.url for s in stand_ins], hedge_percentile=None, max_workers=64
+    )
+
+    def call():
+        pool.get("/table/v1/driving/x", (1.0, 2.0))
+
+    threads = [threading.Thread(target=call) for _ in range(32)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 32 件が並行に処理される（8 スレッド固定なら 0.8 秒以上かかる）
+    assert time.perf_counter() - t0 < 0.6
+
+
+def test_queued_time_does_not_trigger_hedge(stand_ins):
+    ob = _import_backends()
+    a, b = stand_ins
+    a.delay_s = b.delay_s = 0.2
+    # ワーカー 1 つ: 2 件目は 0.2 秒待たされるが、送信後 0.3 秒以内に応答する
+    pool = ob.OsrmBackends([a.url, b.url], hedge_initial_ms=300, max_workers=1)
+    pool.choose = lambda exclude=(): next(
+        (x for x in pool.backends if x not in exclude), None
+    )
+
+    threads = [
+        threading.Thread(target=pool.get, args=("/route/v1/driving/x", (1.0, 2.0)))
+        for _ in range(2)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert a.hits == 2 and b.hits == 0
+
+
+def test_all_backends_failing_raises(stand_ins):
+    ob = _import_backends()
+    for s in stand_ins:
+        s.status = 502
+    pool = ob.OsrmBackends([s.url for s in stand_ins], hedge_percentile=None)
+    with pytest.raises(requests.HTTPError):
+        pool.get("/table/v1/driving/x", (1.0, 2.0))
+
+
+def test_selection_prefers_low_latency():
+    ob = _import_backends()
+    pool = ob.OsrmBackends(["http://fast", "http://slow"])
+    fast, slow = pool.backends
+    for _ in range(20):
+        pool._record(fast, True, 10.0)
+        pool._record(slow, True, 1000.0)
+
+    picks = [pool.choose().url for _ in range(500)]
+    assert picks.count("http://fast") > 400
+    # ヘッジの遅延は観測したレイテンシの分位点
+    assert pool._hedge_delay_s(fast) == pytest.approx(0.010)
@@ -1,3 +1,4 @@
+import json
 import re
 
 import pytest
@@ -38,7 +39,29 @@ def test_get_distance_matrix_success():
     )
 
     dm = client.get_distance_matrix(base_url, coords, (1.0, 2.0))
-    assert dm == [[0, 1000], [1000, 0]]
+    assert len(dm) == 2
+    assert dm.tolist() == [[0, 1000], [1000, 0]]
+
+
+@responses.activate
+def test_get_distance_matrix_unreachable_pair_raises():
+    client = _import_client()
+    base_url = "https://osrm.test"
+    coords = [(35.0, 135.0), (35.1, 135.1)]
+    path = "135.0,35.0;135.1,35.1"
+    url = f"{base_url}/table/v1/driving/{path}?annotations=distance"
+
+    # OSRM は到達不能なペアを null で返す
+    responses.add(
+        responses.GET,
+        url,
+        json={"distances": [[0, None], [1000, 0]]},
+        status=200,
+    )
+
+    with pytest.raises(Exception) as ei:
+        client.get_distance_matrix(base_url, coords, (1.0, 2.0))
+    assert "unreachable" in str(ei.value)
 
 
 @responses.activate
@@ -100,6 +123,38 @@ def test_get_distance_matrix_timeout_raises():
     assert "OSRM table request failed" in str(ei.value)
 
 
+@responses.activate
+def test_get_distance_matrix_tiles_large_tables(monkeypatch):
+    client = _import_client()
+    # ストリーミング解析の経路も通すため高速パスを無効化する
+    monkeypatch.setattr(client.osrm_json, "FAST_PATH_MAX_CELLS", 0)
+    base_url = "https://osrm.test"
+    coords = [(35.0 + i * 0.01, 135.0) for i in range(5)]
+
+    def full(i, j):
+        return i * 10 + j
+
+    def table_callback(request):
+        path, _, query = request.url.partition("?")
+        pts = path.rsplit("/", 1)[1].split(";")
+        idx = [round((float(p.split(",")[1]) - 35.0) / 0.01) for p in pts]
+        params = dict(kv.split("=") for kv in query.split("&"))
+        src = [int(s) for s in params["sources"].split(";")] if "sources" in params else range(len(idx))
+        dst = [int(d) for d in params["destinations"].split(";")] if "destinations" in params else range(len(idx))
+        # 1 回のリクエストの座標数は上限以内であること
+        assert len(pts) <= 4
+        body = {"distances": [[full(idx[s], idx[d]) for d in dst] for s in src]}
+        return 200, {}, json.dumps(body)
+
+    responses.add_callback(
+        responses.GET, re.compile(rf"^{base_url}/table/v1/driving/.+"), callback=table_callback
+    )
+
+    dm = client.get_distance_matrix(base_url, coords, (1.0, 2.0), max_coords=4)
+    assert dm.tolist() == [[full(i, j) for j in range(5)] for i in range(5)]
+    assert len(responses.calls) > 1
+
+
 @responses.activate
 def test_get_route_geometries_success():
     client = _import_client()
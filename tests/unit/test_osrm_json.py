@@ -0,0 +1,69 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_osrm_json():
+    return importlib.import_module("server.osrm_json")
+
+
+def _chunks(raw: bytes, size: int):
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 10_000])
+def test_parse_table_any_chunking(chunk_size):
+    oj = _import_osrm_json()
+    dist = [[0, 12.5, 300], [11, 0, 2.25], [301, 2, 0]]
+    dur = [[0, 1, 2], [3, 0, 4], [5, 6, 0]]
+    raw = json.dumps(
+        {"code": "Ok", "durations": dur, "distances": dist, "sources": []},
+        indent=1,  # 改行や空白が入っても解析できること
+    ).encode()
+
+    out_dist = np.zeros((3, 3))
+    out_dur = np.zeros((3, 3))
+    found = oj.parse_table(
+        _chunks(raw, chunk_size), {"distances": out_dist, "durations": out_dur}
+    )
+
+    assert found == {"distances", "durations"}
+    assert out_dist.tolist() == dist
+    assert out_dur.tolist() == dur
+
+
+def test_parse_table_fills_strided_view_in_place():
+    oj = _import_osrm_json()
+    big = np.zeros((4, 4))
+    raw = json.dumps({"distances": [[1, 2], [3, 4]]}).encode()
+
+    oj.parse_table(_chunks(raw, 5), {"distances": big[0:2, 2:4]})
+
+    assert big[0:2, 2:4].tolist() == [[1, 2], [3, 4]]
+    assert big[:, 0:2].sum() == 0
+
+
+def test_parse_table_null_becomes_nan_and_missing_key_reported():
+    oj = _import_osrm_json()
+    out = np.zeros((2, 2))
+    found = oj.parse_table([b'{"distances":[[0,null],[1,0]]}'], {"distances": out})
+    assert found == {"distances"}
+    assert np.isnan(out[0, 1])
+
+    found = oj.parse_table([b'{"code":"NoTable"}'], {"distances": np.zeros((2, 2))})
+    assert found == set()
+
+
+def test_parse_table_rejects_wrong_size():
+    oj = _import_osrm_json()
+    with pytest.raises(ValueError):
+        oj.parse_table([b'{"distances":[[0,1],[1,0]]}'], {"distances": np.zeros((3, 3))})
@@ -0,0 +1,33 @@
+import cProfile
+import importlib
+import sys
+from pathlib import Path
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_profiling():
+    return importlib.import_module("server.profiling")
+
+
+def test_save_keeps_latest_and_tolerates_concurrent_prune(tmp_path, monkeypatch):
+    profiling = _import_profiling()
+    store = profiling.ProfileStore(str(tmp_path), token="t", keep=2)
+    for _ in range(3):
+        store.save(cProfile.Profile(), {"status": 200})
+    assert len(store.list()) == 2
+
+    # glob と stat の間に別スレッドが削除したファイルがあっても失敗しない
+    real_glob = Path.glob
+
+    def glob_with_vanished(self, pattern):
+        yield from real_glob(self, pattern)
+        yield self / ("0" * 32 + ".json")
+
+    monkeypatch.setattr(Path, "glob", glob_with_vanished)
+    pid = store.save(cProfile.Profile(), {"status": 200})
+    assert store.dump_path(pid) is not None
+    assert len(list(real_glob(tmp_path, "*.json"))) == 2
@@ -0,0 +1,115 @@
+import importlib
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_scheduler():
+    return importlib.import_module("server.scheduler")
+
+
+def _hold_slot(sched, priority, release: threading.Event, log: list, name: str):
+    def run():
+        with sched.slot(priority):
+            log.append(name)
+            release.wait(5)
+
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+
+def _wait_until(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_caps_concurrency_and_serves_interactive_first():
+    sched_mod = _import_scheduler()
+    sched = sched_mod.SolveScheduler(max_concurrent=1, max_queue=8, max_wait_s=5)
+    release = threading.Event()
+    log = []
+
+    first = _hold_slot(sched, "interactive", release, log, "first")
+    _wait_until(lambda: log == ["first"])
+
+    # 実行中の 1 件が終わるまで待機させる（batch を先に並べる）
+    order = []
+
+    def queued(priority, name):
+        with sched.slot(priority):
+            order.append(name)
+
+    threads = [threading.Thread(target=queued, args=("batch", "batch"))]
+    threads[0].start()
+    _wait_until(lambda: sched.stats()["queued"]["batch"] == 1)
+    threads.append(threading.Thread(target=queued, args=("interactive", "ui")))
+    threads[1].start()
+    _wait_until(lambda: sched.stats()["queued"]["interactive"] == 1)
+    assert sched.stats()["running"] == 1
+
+    release.set()
+    for t in [first] + threads:
+        t.join(5)
+    # 後から来た interactive が batch より先に実行される
+    assert order == ["ui", "batch"]
+
+
+def test_sheds_when_queue_full_with_retry_after():
+    sched_mod = _import_scheduler()
+    sched = sched_mod.SolveScheduler(
+        max_concurrent=1, max_queue=1, max_batch_queue=0, max_wait_s=5
+    )
+    release = threading.Event()
+    log = []
+    t1 = _hold_slot(sched, "interactive", release, log, "running")
+    _wait_until(lambda: log == ["running"])
+    t2 = _hold_slot(sched, "interactive", release, log, "queued")
+    _wait_until(lambda: sched.stats()["queued"]["interactive"] == 1)
+
+    with pytest.raises(sched_mod.Overloaded) as ei:
+        sched.check_admission("interactive")
+    assert ei.value.retry_after_s >= 1.0
+    # batch はキュー上限 0 なのですぐに拒否される
+    with pytest.raises(sched_mod.Overloaded):
+        with sched.slot("batch"):
+            pass
+
+    release.set()
+    t1.join(5)
+    t2.join(5)
+    sched.check_admission("batch")
+
+
+def test_wait_deadline_sheds_and_budget_scales_with_backlog():
+    sched_mod = _import_scheduler()
+    sched = sched_mod.SolveScheduler(max_concurrent=1, max_queue=8, max_wait_s=0.1)
+    release = threading.Event()
+    log = []
+    t1 = _hold_slot(sched, "interactive", release, log, "running")
+    _wait_until(lambda: log == ["running"])
+
+    # サービス時間の見積もりを小さくして、待ち時間の上限で打ち切られることを確認する
+    sched._service_s = 0.01
+    with pytest.raises(sched_mod.Overloaded):
+        with sched.slot("interactive"):
+            pass
+    assert sched.stats()["queued"]["interactive"] == 0
+    release.set()
+    t1.join(5)
+
+    with sched.slot("interactive") as ticket:
+        assert ticket.budget_scale == 1.0
+    sched._queued["batch"] = 3  # 待機中の backlog を模擬する
+    with sched.slot("interactive") as ticket:
+        assert ticket.budget_scale == pytest.approx(0.25)
@@ -0,0 +1,103 @@
+import importlib
+import json
+import re
+import sys
+from pathlib import Path
+
+import pytest
+import responses
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+BASE_URL = "https://osrm.test"
+COORDS = [(35.0, 135.0), (35.01, 135.01), (35.02, 135.02), (35.03, 135.03)]
+
+
+def _import_snapshot():
+    return importlib.import_module("server.snapshot")
+
+
+def _mock_table(scale: int):
+    """座標から決定的な距離・所要時間を返す table API を登録する。"""
+
+    def callback(request):
+        pts = request.url.partition("?")[0].rsplit("/", 1)[1].split(";")
+        idx = [round((float(p.split(",")[1]) - 35.0) / 0.01) for p in pts]
+        dist = [[scale * abs(i - j) for j in idx] for i in idx]
+        dur = [[abs(i - j) for j in idx] for i in idx]
+        return 200, {}, json.dumps({"distances": dist, "durations": dur})
+
+    responses.add_callback(
+        responses.GET, re.compile(rf"^{BASE_URL}/table/v1/driving/.+"), callback=callback
+    )
+
+
+@responses.activate
+def test_build_and_lookup_submatrix(tmp_path):
+    snapshot = _import_snapshot()
+    _mock_table(scale=100)
+    meta = snapshot.build_snapshot(str(tmp_path), "tokyo", COORDS, base_url=BASE_URL)
+    assert meta["size"] == 4
+    assert "annotations=distance,duration" in responses.calls[0].request.url
+
+    store = snapshot.SnapshotStore(str(tmp_path))
+    # 要求順に並べ替えた部分行列が返る
+    dm = store.lookup([COORDS[3], COORDS[0], COORDS[2]])
+    assert dm.tolist() == [[0, 300, 100], [300, 0, 200], [100, 200, 0]]
+
+    # 未登録の座標を含む場合は None（OSRM にフォールバック）
+    assert store.lookup([COORDS[0], (36.0, 136.0)]) is None
+
+
+@responses.activate
+def test_snap_jittered_coords_to_snapshot_points(tmp_path):
+    snapshot = _import_snapshot()
+    _mock_table(scale=100)
+    snapshot.build_snapshot(str(tmp_path), "tokyo", COORDS, base_url=BASE_URL)
+    store = snapshot.SnapshotStore(str(tmp_path))
+
+    jittered = [(35.0000001, 134.9999999), (35.0300002, 135.03), (36.0, 136.0)]
+    snapped = store.snap(jittered, tolerance_m=1.0)
+    assert snapped == [COORDS[0], COORDS[3], (36.0, 136.0)]
+    assert store.lookup(snapped[:2]).tolist() == [[0, 300], [300, 0]]
+
+
+@responses.activate
+def test_refresh_picks_up_new_osrm_data(tmp_path):
+    snapshot = _import_snapshot()
+    _mock_table(scale=100)
+    snapshot.build_snapshot(str(tmp_path), "tokyo", COORDS, base_url=BASE_URL)
+    store = snapshot.SnapshotStore(str(tmp_path), reload_interval_s=60)
+    assert store.lookup(COORDS[:2]).tolist() == [[0, 100], [100, 0]]
+
+    responses.reset()
+    _mock_table(scale=250)
+    snapshot.refresh_snapshot(str(tmp_path), "tokyo")
+
+    # 再読み込み間隔内はディレクトリを再走査しない
+    assert store.lookup(COORDS[:2]).tolist() == [[0, 100], [100, 0]]
+    store.reload_interval_s = 0
+    assert store.lookup(COORDS[:2]).tolist() == [[0, 250], [250, 0]]
+    # 古いバージョンのファイルは削除される
+    assert len(list((tmp_path / "tokyo").glob("distances-*.npy"))) == 1
+
+
+def test_invalid_name_rejected(tmp_path):
+    snapshot = _import_snapshot()
+    with pytest.raises(ValueError):
+        snapshot.build_snapshot(str(tmp_path), "../etc", COORDS, base_url=BASE_URL)
+
+
+def test_load_coords_file_csv_and_json(tmp_path):
+    snapshot = _import_snapshot()
+    csv_path = tmp_path / "set.csv"
+    csv_path.write_text("lat,lng\n35.0,135.0\n35.1,135.1\n")
+    json_path = tmp_path / "set.json"
+    json_path.write_text('[{"lat": 35.0, "lng": 135.0}, [35.1, 135.1]]')
+
+    expected = [(35.0, 135.0), (35.1, 135.1)]
+    assert snapshot.load_coords_file(str(csv_path)) == expected
+    assert snapshot.load_coords_file(str(json_path)) == expected
@@ -61,3 +61,63 @@ def test_solve_degenerate_only_depot():
     route, total = solver.solve_tsp_distance_matrix(dm, time_limit_ms=100)
     assert route == []
     assert total == 0
+
+
+def test_solve_with_stats_reports_time_to_best():
+    solver = _import_solver()
+    dm = [
+        [0, 1, 1],
+        [1, 0, 2],
+        [1, 2, 0],
+    ]
+    route, total, stats = solver.solve_tsp_with_stats(dm, time_limit_ms=200)
+
+    assert set(route) == {0, 1}
+    assert stats.n == 3
+    assert stats.time_limit_ms == 200
+    assert stats.solutions >= 1
+    assert 0 <= stats.time_to_best_ms <= stats.wall_ms
+
+
+def test_nearest_neighbors_from_matrix():
+    solver = _import_solver()
+    import numpy as np
+
+    costs = np.array(
+        [
+            [0, 5, 1, 9],
+            [5, 0, 2, 3],
+            [1, 2, 0, 4],
+            [9, 3, 4, 0],
+        ]
+    )
+    knn = solver.nearest_neighbors(costs, 2)
+    # 自分自身は含まない
+    assert [sorted(row) for row in knn.tolist()] == [[1, 2], [2, 3], [0, 1], [1, 2]]
+
+
+def test_solve_with_neighbor_restriction_stays_feasible():
+    solver = _import_solver()
+    # 遠く離れた 2 つのクラスタ: k=1 の近傍グラフだけでは巡回路が作れない
+    pts = [(0, 0)] + [(i, 0) for i in range(1, 6)] + [(1000 + i, 0) for i in range(6)]
+    dm = [[abs(a[0] - b[0]) + abs(a[1] - b[1]) for b in pts] for a in pts]
+
+    route, total, stats = solver.solve_tsp_with_stats(dm, time_limit_ms=300, neighbors=1)
+
+    assert stats.neighbors == 1
+    assert sorted(route) == list(range(len(pts) - 1))
+    tour_nodes = [0] + [r + 1 for r in route] + [0]
+    assert total == _tour_cost(dm, tour_nodes)
+    assert total == 2 * 1005
+
+
+def test_neighbor_restriction_ignored_for_small_instances():
+    solver = _import_solver()
+    dm = [
+        [0, 1, 1],
+        [1, 0, 2],
+        [1, 2, 0],
+    ]
+    route, total, stats = solver.solve_tsp_with_stats(dm, time_limit_ms=200, neighbors=5)
+    assert stats.neighbors is None
+    assert set(route) == {0, 1}
@@ -0,0 +1,80 @@
+import importlib
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_spatial():
+    return importlib.import_module("server.spatial")
+
+
+def test_haversine_one_degree_latitude():
+    spatial = _import_spatial()
+    assert spatial.haversine_m((35.0, 135.0), (36.0, 135.0)) == pytest.approx(111_195, rel=1e-3)
+
+
+def test_grid_index_nearest_within_tolerance():
+    spatial = _import_spatial()
+    grid = spatial.GridIndex(1.0)
+    grid.add(35.0, 135.0, "a")
+    grid.add(35.00002, 135.0, "b")  # 約 2.2m 北
+
+    # 数センチずれた点は最寄りの既知点に吸着する
+    d, point, value = grid.nearest(35.0000001, 135.0000001)
+    assert value == "a" and point == (35.0, 135.0) and d < 0.05
+    # 許容範囲外なら None
+    assert grid.nearest(35.00001, 135.0) is None
+
+
+def test_grid_index_finds_tolerance_sized_offsets_at_high_longitude():
+    spatial = _import_spatial()
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(35.0, 35.5, 2000)
+    lngs = rng.uniform(139.0, 139.5, 2000)
+    # 約 0.9m 南北にずらした点（東京付近）
+    dlat = math.degrees(0.9 / spatial.EARTH_RADIUS_M)
+    misses = 0
+    for lat, lng in zip(lats, lngs):
+        grid = spatial.GridIndex(1.0)
+        grid.add(lat, lng, "a")
+        if grid.nearest(lat + dlat, lng) is None:
+            misses += 1
+    assert misses == 0
+
+    # 東西・斜め方向のずれも同様に見つかる
+    grid = spatial.GridIndex(1.0)
+    grid.add(35.6586, 139.7454, "a")
+    step = math.degrees(0.6 / spatial.EARTH_RADIUS_M)
+    for dy, dx in [(0, 1), (1, 1), (-1, 1), (-1, -1)]:
+        lat = 35.6586 + dy * step
+        lng = 139.7454 + dx * step / math.cos(math.radians(35.6586))
+        assert grid.nearest(lat, lng) is not None
+
+
+def test_merge_colocated_and_expand_route():
+    spatial = _import_spatial()
+    points = [
+        (35.0, 135.0),
+        (35.01, 135.01),
+        (35.0000002, 135.0000001),  # 0 とほぼ同一地点
+        (35.02, 135.02),
+        (35.0100001, 135.01),  # 1 とほぼ同一地点
+    ]
+    reps, members = spatial.merge_colocated(points, 1.0)
+
+    assert reps == [points[0], points[1], points[3]]
+    assert members == [[0, 2], [1, 4], [3]]
+    # 代表点の巡回順を元のインデックスに展開する（同一地点は連続して訪問）
+    assert spatial.expand_route([2, 0, 1], members) == [3, 0, 2, 1, 4]
+
+    # 許容距離 0 なら統合しない
+    reps, members = spatial.merge_colocated(points, 0)
+    assert len(reps) == 5
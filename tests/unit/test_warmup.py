@@ -0,0 +1,44 @@
+import importlib
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# `import server` が動作するようにプロジェクトルートを sys.path に追加する
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _import_warmup():
+    return importlib.import_module("server.warmup")
+
+
+def test_warmup_runs_dummy_solve_and_reports_timings():
+    warmup_mod = _import_warmup()
+    w = warmup_mod.SolverWarmup()
+    assert w.state == "pending" and not w.ready
+
+    w.start()
+    w.start()  # 二重起動しても 1 回だけ実行される
+    assert w.wait(30)
+
+    assert w.ready
+    report = w.report()
+    assert report["state"] == "ready"
+    assert {"solver_import_ms", "warmup_solve_ms", "ready_ms"} <= report.keys()
+
+
+def test_app_import_does_not_load_ortools():
+    # 別プロセスで読み込み、起動時に OR-Tools が読み込まれないことを確認する
+    env = {**os.environ, "SOLVER_WARMUP": "0"}
+    code = "import sys, server.app; print('ortools' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == "False"